@@ -0,0 +1,372 @@
+# Service ASGI des routes de backend/routes/routes.py, avec accès non bloquant
+# à PostGIS (SQLAlchemy async + asyncpg). Les requêtes SQL et la sérialisation
+# sont celles de l'application Flask : les réponses sont identiques octet pour
+# octet. Lancement : uvicorn backend.asgi:app (make asgi).
+import asyncio
+import io
+import json
+from contextlib import AsyncExitStack
+from functools import wraps
+
+from flask import Flask
+from sqlalchemy import select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from backend.config import configurer
+from backend.models.obs import Obs
+from backend.models.quiet_zone import QuietZone
+from backend.routes.routes import (
+    fusionner_especes,
+    parametres_analyse,
+    parametres_grid,
+    parametres_zones_sensibles,
+    parametres_zones_sensibles_batch,
+)
+from backend.utils.connexions import delai_depasse, erreur_base
+from backend.utils.env import BIND_LECTURE
+from backend.utils.filtres import cle_id, cle_position
+from backend.utils.formats import (
+    ECRITURES,
+    MIMETYPES,
+    arrow_select,
+    construire_table,
+    erreur_format,
+    preparer_spatiale,
+)
+from backend.utils.geojson import (
+    TAILLE_LOT,
+    feature_collection_chunks_async,
+    geojson_select,
+)
+from backend.utils.params import ParametreInvalide
+from backend.utils.passages import ETAT_CUBE, ETAT_GRILLE, ETAT_TRACES, source_passages
+from backend.utils.pyramide import ETAT_PYRAMIDE
+from backend.utils.queries import analyse_query, obs_grid_query, zones_sensibles_query
+
+# Même configuration (variables d'environnement) que l'application Flask ;
+# son contexte donne accès à la configuration (RASTER_PASSAGES_DIR) pendant les requêtes
+configuration = Flask(__name__)
+configurer(configuration)
+
+
+def _moteur(config):
+    """
+    Moteur asyncpg sur la réplique si elle est configurée (les routes servies
+    ici ne font que des lectures), sinon sur la base principale.
+    """
+    binds = config.get("SQLALCHEMY_BINDS", {})
+    if BIND_LECTURE in binds:
+        url = binds[BIND_LECTURE]["url"]
+    else:
+        url = config["SQLALCHEMY_DATABASE_URI"]
+    options = dict(config["SQLALCHEMY_ENGINE_OPTIONS"])
+    # Le délai par défaut passe par les paramètres serveur d'asyncpg
+    options.pop("connect_args", None)
+    if config["STATEMENT_TIMEOUT"]:
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(config["STATEMENT_TIMEOUT"])}
+        }
+    return create_async_engine(make_url(url).set(drivername="postgresql+asyncpg"), **options)
+
+
+moteur = _moteur(configuration.config)
+
+
+def reponse_json(corps, statut: int = 200) -> Response:
+    # Même sérialisation que jsonify : clés triées, compacte, saut de ligne final
+    return Response(
+        json.dumps(corps, separators=(",", ":"), sort_keys=True) + "\n",
+        status_code=statut,
+        media_type="application/json",
+    )
+
+
+async def _lignes(requete):
+    async with moteur.connect() as conn:
+        return (await conn.execute(requete)).all()
+
+
+async def _en_parallele(*requetes):
+    # Requêtes indépendantes exécutées en même temps, chacune sur sa connexion
+    return await asyncio.gather(*(_lignes(requete) for requete in requetes))
+
+
+async def _etats(*requetes):
+    """
+    Première ligne de chaque requête d'état, lues en parallèle.
+    None si la table est vide ou si sa migration n'est pas appliquée.
+    """
+
+    async def premiere(requete):
+        try:
+            rows = await _lignes(requete)
+        except ProgrammingError:
+            return None
+        return rows[0] if rows else None
+
+    return await asyncio.gather(*(premiere(requete) for requete in requetes))
+
+
+async def _requete_passages(constructeur, *args, **kwargs):
+    """
+    Requête d'un constructeur de queries.py utilisant les passages par maille,
+    avec le même choix de source que la route Flask. L'état de la grille n'est
+    lu que si le cube SQL est périmé. Le chargement du cube raster et
+    CubeRaster.passages (disque et numpy) tournent dans un thread ;
+    asyncio.to_thread y copie le contexte, dont le contexte d'application Flask.
+    """
+    etat, etat_cube = await _etats(ETAT_TRACES, ETAT_CUBE)
+    if etat is None:
+        # Table trace absente : la jointure remonte l'erreur SQL
+        source = "jointure"
+    elif etat_cube is not None and tuple(etat_cube) == tuple(etat):
+        source = "cube"
+    else:
+        (grille,) = await _etats(ETAT_GRILLE)
+        source = await asyncio.to_thread(
+            source_passages, tuple(etat), etat_cube, tuple(grille or ())
+        )
+    return await asyncio.to_thread(constructeur, *args, source=source, **kwargs)
+
+
+async def _ouvrir(timeout_ms):
+    """
+    Connexion en transaction (nécessaire au curseur serveur) limitée à
+    timeout_ms ; à refermer par _fermer.
+    """
+    pile = AsyncExitStack()
+    try:
+        conn = await pile.enter_async_context(moteur.connect())
+        await pile.enter_async_context(conn.begin())
+        if timeout_ms:
+            await conn.execute(
+                text("SELECT set_config('statement_timeout', :delai, true)"),
+                {"delai": str(int(timeout_ms))},
+            )
+    except BaseException as err:
+        await _fermer(pile, err)
+        raise
+    return conn, pile
+
+
+async def _fermer(pile, err=None):
+    # Commit en fin de lecture, rollback si la lecture a échoué ou a été interrompue
+    if err is None:
+        await pile.aclose()
+    else:
+        await pile.__aexit__(type(err), err, err.__traceback__)
+
+
+async def _reponse_geojson(query, precision, page, timeout_ms):
+    stmt, proprietes = geojson_select(query, precision)
+    # Comme pour Flask, la requête est exécutée avant l'envoi des en-têtes
+    conn, pile = await _ouvrir(timeout_ms)
+    try:
+        result = await conn.stream(
+            stmt.execution_options(
+                yield_per=configuration.config.get("TAILLE_LOT", TAILLE_LOT)
+            )
+        )
+    except BaseException as err:
+        await _fermer(pile, err)
+        raise
+    partitions = result.partitions()
+    membres = None
+    if page is not None:
+        partitions = page.lots_async(partitions)
+
+        def membres():
+            return {"next_cursor": page.curseur}
+
+    async def corps():
+        try:
+            async for morceau in feature_collection_chunks_async(partitions, proprietes, membres):
+                yield morceau
+        except BaseException as err:
+            await _fermer(pile, err)
+            raise
+        await _fermer(pile)
+
+    return StreamingResponse(corps(), media_type="application/json")
+
+
+async def _reponse_binaire(format, query, precision, page, timeout_ms):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as err:
+        return reponse_json(erreur_format(format, err), 501)
+
+    stmt, proprietes = arrow_select(query, precision)
+    conn, pile = await _ouvrir(timeout_ms)
+    try:
+        rows = (await conn.execute(stmt)).all()
+    except BaseException as err:
+        await _fermer(pile, err)
+        raise
+    await _fermer(pile)
+    if page is not None:
+        rows = page.tronquer(rows)
+
+    def ecrire():
+        sink = io.BytesIO()
+        ECRITURES[format](construire_table(rows, proprietes), sink)
+        return sink.getvalue()
+
+    # Sérialisation hors de la boucle d'événements (calcul, pas d'attente)
+    try:
+        contenu = await asyncio.to_thread(ecrire)
+    except ImportError as err:
+        return reponse_json(erreur_format(format, err), 501)
+    response = Response(contenu, media_type=MIMETYPES[format])
+    if page is not None and page.curseur is not None:
+        response.headers["X-Next-Cursor"] = page.curseur
+    return response
+
+
+async def reponse_spatiale(query, args, filtres, compte, timeout_ms, cle=cle_id):
+    # Équivalent asynchrone de formats.reponse_spatiale
+    format, query, precision, page = preparer_spatiale(query, args, filtres, compte, cle)
+    if format == "geojson":
+        return await _reponse_geojson(query, precision, page, timeout_ms)
+    return await _reponse_binaire(format, query, precision, page, timeout_ms)
+
+
+def route(chemin, endpoint, timeout_ms=None):
+    """
+    Route GET sous /api. endpoint : nom de la route Flask, pour que
+    STATEMENT_TIMEOUTS s'applique aux deux services ; la vue reçoit les
+    paramètres de la requête et le délai de ses requêtes en ms.
+    """
+
+    def decorateur(vue):
+        @wraps(vue)
+        async def wrapper(request):
+            with configuration.app_context():
+                delai = configuration.config["STATEMENT_TIMEOUTS"].get(endpoint, timeout_ms)
+                return await vue(request.query_params, delai)
+
+        return Route(f"/api{chemin}", wrapper, methods=["GET"], name=endpoint)
+
+    return decorateur
+
+
+@route("/ping", "ardeche.ping")
+async def ping(args, delai):
+    return reponse_json({"status": "ok", "message": "Ardeche API is alive"})
+
+
+@route("/species", "ardeche.list_quiet_zone_species")
+async def list_quiet_zone_species(args, delai):
+    # Les deux listes d'espèces sont lues en même temps
+    quiet_zone_rows, obs_rows = await _en_parallele(
+        select(QuietZone.cd_nom, QuietZone.nom_valide),
+        select(Obs.cd_nom, Obs.nom_valide),
+    )
+    return reponse_json({"species": fusionner_especes(quiet_zone_rows, obs_rows)})
+
+
+@route("/grid", "ardeche.obs_grid", timeout_ms=15_000)
+async def obs_grid(args, delai):
+    parametres, filtres = parametres_grid(args)
+    (etat_pyramide,) = await _etats(ETAT_PYRAMIDE)
+
+    return await reponse_spatiale(
+        obs_grid_query(**parametres, pyramide=etat_pyramide is not None),
+        args,
+        filtres,
+        "count",
+        delai,
+        cle=cle_position,
+    )
+
+
+@route("/analyse", "ardeche.analyse", timeout_ms=30_000)
+async def analyse(args, delai):
+    parametres, filtres = parametres_analyse(args)
+
+    return await reponse_spatiale(
+        await _requete_passages(analyse_query, **parametres),
+        args,
+        filtres,
+        "nb_passages",
+        delai,
+    )
+
+
+@route("/zones-sensibles", "ardeche.zones_sensibles", timeout_ms=60_000)
+async def zones_sensibles(args, delai):
+    parametres, filtres = parametres_zones_sensibles(args)
+
+    return await reponse_spatiale(
+        await _requete_passages(zones_sensibles_query, **parametres),
+        args,
+        filtres,
+        "nb_passages_max",
+        delai,
+    )
+
+
+@route("/zones-sensibles/batch", "ardeche.zones_sensibles_batch", timeout_ms=120_000)
+async def zones_sensibles_batch(args, delai):
+    parametres, filtres = parametres_zones_sensibles_batch(args)
+
+    return await reponse_spatiale(
+        await _requete_passages(zones_sensibles_query, **parametres),
+        args,
+        filtres,
+        "nb_passages_max",
+        delai,
+    )
+
+
+async def _parametre_invalide(request, err: ParametreInvalide):
+    return reponse_json({"error": err.error, "detail": err.detail}, 400)
+
+
+# SQLSTATE des connexions refusées ou perdues : classe 08 et cannot_connect_now
+PGCODES_CONNEXION = ("08", "57P03")
+
+
+def _connexion_impossible(err) -> bool:
+    orig = getattr(err, "orig", None)
+    pgcode = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None) or ""
+    return (
+        err.connection_invalidated
+        or isinstance(err, (OperationalError, InterfaceError))
+        or pgcode.startswith(PGCODES_CONNEXION)
+    )
+
+
+async def _erreur_base(request, err):
+    """
+    asyncpg ne lève pas d'OperationalError : le délai dépassé arrive en
+    DBAPIError (pgcode 57014), la connexion refusée en DBAPIError (classe 08)
+    ou en ConnectionError. Les autres erreurs, SQL ou d'entrée-sortie (fichiers
+    du cube raster...), restent des erreurs serveur (500).
+    """
+    if isinstance(err, DBAPIError) and not (delai_depasse(err) or _connexion_impossible(err)):
+        raise err
+    corps, statut = erreur_base(err)
+    return reponse_json(corps, statut)
+
+
+app = Starlette(
+    routes=[
+        ping,
+        list_quiet_zone_species,
+        obs_grid,
+        analyse,
+        zones_sensibles,
+        zones_sensibles_batch,
+    ],
+    exception_handlers={
+        ParametreInvalide: _parametre_invalide,
+        DBAPIError: _erreur_base,
+        ConnectionError: _erreur_base,
+    },
+)
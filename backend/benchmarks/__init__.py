@@ -0,0 +1,2 @@
+from backend.benchmarks.rapport import comparer, construire_rapport
+from backend.benchmarks.scenarios import SCENARIOS, executer_scenario
@@ -0,0 +1,77 @@
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from backend.utils.env import db
+
+RACINE_DEPOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+# Indicateurs comparés entre deux rapports
+INDICATEURS = (("latence_ms", "p50"), ("latence_ms", "p95"), ("memoire_pic_octets", None))
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=RACINE_DEPOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _volumes():
+    volumes = {}
+    for table in ("obs", "trace", "grille_200_4326", "quiet_zone"):
+        volumes[table] = db.session.execute(
+            text(f"SELECT count(*) FROM ardeche.{table}")
+        ).scalar()
+    return volumes
+
+
+def construire_rapport(resultats, echelle):
+    """
+    Rapport JSON d'une exécution : commit, environnement, volumes en base et
+    résultats par scénario et par mode (froid/chaud).
+    """
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "modifie": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "echelle": echelle,
+        "python": platform.python_version(),
+        "postgis": db.session.execute(text("SELECT postgis_full_version()")).scalar(),
+        "volumes": _volumes(),
+        "resultats": resultats,
+    }
+
+
+def _valeur(resultat, indicateur, cle):
+    valeur = resultat[indicateur]
+    return valeur[cle] if cle else valeur
+
+
+def comparer(base, nouveau, seuil):
+    """
+    Lignes de comparaison entre deux rapports et liste des régressions
+    (hausse de plus de seuil % d'un indicateur).
+    """
+    lignes = []
+    regressions = []
+    for nom, modes in nouveau["resultats"].items():
+        for mode, resultat in modes.items():
+            reference = base["resultats"].get(nom, {}).get(mode)
+            if reference is None:
+                lignes.append(f"{nom} [{mode}] : absent du rapport de base")
+                continue
+            for indicateur, cle in INDICATEURS:
+                avant = _valeur(reference, indicateur, cle)
+                apres = _valeur(resultat, indicateur, cle)
+                variation = (apres - avant) / avant * 100 if avant else 0.0
+                libelle = f"{nom} [{mode}] {cle or indicateur}"
+                lignes.append(f"{libelle} : {avant} -> {apres} ({variation:+.1f} %)")
+                if variation > seuil:
+                    regressions.append(libelle)
+    return lignes, regressions
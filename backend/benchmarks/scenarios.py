@@ -0,0 +1,91 @@
+import math
+import time
+import tracemalloc
+
+from backend.utils.env import db
+from backend.utils.synthetic import CD_NOMS
+
+# Période d'été couverte par les données synthétiques (2020-2024)
+PERIODE = {"date-min": "2022-06-01", "date-max": "2022-08-31"}
+
+# Requêtes mesurées : chemin et paramètres, sur les espèces des données synthétiques
+SCENARIOS = {
+    "species": ("/api/species", {}),
+    "grid": ("/api/grid", {"cell_size": "0.01", "cd_nom": str(CD_NOMS[0])}),
+    "analyse": ("/api/analyse", PERIODE),
+    "zones-sensibles": ("/api/zones-sensibles", {**PERIODE, "cd_nom": str(CD_NOMS[0])}),
+    "zones-sensibles-batch": ("/api/zones-sensibles/batch", {**PERIODE, "cd_nom": "all"}),
+}
+
+
+def percentile(valeurs, p):
+    # Rang le plus proche sur les valeurs triées
+    valeurs = sorted(valeurs)
+    rang = max(0, math.ceil(p / 100 * len(valeurs)) - 1)
+    return valeurs[rang]
+
+
+def _requete(client, chemin, params):
+    # buffered=True : le corps envoyé en flux est lu en entier dans la mesure
+    response = client.get(chemin, query_string=params, buffered=True)
+    resultat = (
+        response.status_code,
+        len(response.get_data()),
+        response.headers.get("Server-Timing"),
+    )
+    response.close()
+    return resultat
+
+
+def executer_scenario(app, nom, repetitions, froid):
+    """
+    Latences (ms) et pic mémoire Python d'un scénario.
+    froid : cache des réponses vidé et connexions fermées avant chaque requête ;
+    chaud : cache rempli par une première requête non mesurée.
+    """
+    chemin, params = SCENARIOS[nom]
+    client = app.test_client()
+    cache = app.extensions.get("cache_reponses")
+
+    def preparer():
+        if froid:
+            if cache is not None:
+                cache.vider()
+            db.engine.dispose()
+
+    if not froid:
+        _requete(client, chemin, params)
+
+    durees = []
+    for _ in range(repetitions):
+        preparer()
+        debut = time.perf_counter()
+        statut, octets, server_timing = _requete(client, chemin, params)
+        durees.append((time.perf_counter() - debut) * 1000)
+
+    # Pic mémoire sur une requête à part : tracemalloc ralentit l'interpréteur
+    # et fausserait les latences. Les tampons de libpq ne sont pas comptés.
+    preparer()
+    tracemalloc.start()
+    try:
+        _requete(client, chemin, params)
+        pic = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "statut": statut,
+        "octets": octets,
+        "server_timing": server_timing,
+        "repetitions": repetitions,
+        "latence_ms": {
+            "min": round(min(durees), 2),
+            "p50": round(percentile(durees, 50), 2),
+            "p90": round(percentile(durees, 90), 2),
+            "p95": round(percentile(durees, 95), 2),
+            "p99": round(percentile(durees, 99), 2),
+            "max": round(max(durees), 2),
+            "moyenne": round(sum(durees) / len(durees), 2),
+        },
+        "memoire_pic_octets": pic,
+    }
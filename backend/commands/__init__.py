@@ -0,0 +1,6 @@
+from backend.commands.benchmark import benchmark, benchmark_compare
+from backend.commands.jobs import jobs_worker
+from backend.commands.load import load_data
+from backend.commands.offline import offline
+from backend.commands.plans import check_plans
+from backend.commands.raster import raster
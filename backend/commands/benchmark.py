@@ -0,0 +1,75 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from backend.benchmarks import SCENARIOS, comparer, construire_rapport, executer_scenario
+from backend.commands.plans import amorcer
+
+
+@click.command("benchmark")
+@click.option("--seed", is_flag=True, help="Génère d'abord des données synthétiques")
+@click.option("--scale", default=1.0, show_default=True, help="Échelle des données générées (1, 10, 100)")
+@click.option("--force", is_flag=True, help="Autorise --seed à vider des tables non vides")
+@click.option("--repetitions", default=10, show_default=True, help="Requêtes mesurées par scénario et par mode")
+@click.option(
+    "--scenario",
+    "scenarios",
+    multiple=True,
+    type=click.Choice(list(SCENARIOS)),
+    help="Scénario à exécuter (tous par défaut, option répétable)",
+)
+@click.option("--output", type=click.Path(dir_okay=False), help="Fichier du rapport JSON")
+@with_appcontext
+def benchmark(seed, scale, force, repetitions, scenarios, output):
+    """
+    Mesure les routes de l'API (client de test Flask) cache froid puis chaud :
+    percentiles de latence et pic mémoire, écrits dans un rapport JSON
+    comparable entre commits avec benchmark-compare.
+    --seed n'accepte qu'une base de test (nom contenant "test").
+    """
+    if seed:
+        amorcer(scale, force)
+
+    resultats = {}
+    for nom in scenarios or SCENARIOS:
+        resultats[nom] = {}
+        for mode in ("froid", "chaud"):
+            resultat = executer_scenario(current_app, nom, repetitions, mode == "froid")
+            resultats[nom][mode] = resultat
+            latence = resultat["latence_ms"]
+            click.echo(
+                f"{nom:<24} {mode:<6} p50 {latence['p50']:>9.1f} ms"
+                f"  p95 {latence['p95']:>9.1f} ms"
+                f"  mémoire {resultat['memoire_pic_octets'] / 1e6:>7.1f} Mo"
+                f"  ({resultat['statut']}, {resultat['octets']} octets)"
+            )
+
+    rapport = construire_rapport(resultats, scale)
+    output = output or f"benchmark-{(rapport['commit'] or 'inconnu')[:8]}.json"
+    with open(output, "w", encoding="utf-8") as fichier:
+        json.dump(rapport, fichier, indent=2, ensure_ascii=False)
+    click.echo(f"Rapport écrit dans {output}")
+
+
+@click.command("benchmark-compare")
+@click.argument("base", type=click.File(encoding="utf-8"))
+@click.argument("nouveau", type=click.File(encoding="utf-8"))
+@click.option("--seuil", default=10.0, show_default=True, help="Hausse tolérée en %")
+def benchmark_compare(base, nouveau, seuil):
+    """
+    Compare deux rapports de benchmark et échoue si un indicateur (p50, p95,
+    pic mémoire) augmente de plus de --seuil %.
+    """
+    base, nouveau = json.load(base), json.load(nouveau)
+    if base.get("echelle") != nouveau.get("echelle"):
+        click.echo(
+            f"Attention : échelles différentes ({base.get('echelle')} / {nouveau.get('echelle')})"
+        )
+    lignes, regressions = comparer(base, nouveau, seuil)
+    for ligne in lignes:
+        click.echo(ligne)
+    if regressions:
+        click.echo(f"{len(regressions)} régression(s) au-delà de {seuil} %")
+        raise SystemExit(1)
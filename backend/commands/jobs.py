@@ -0,0 +1,35 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from backend.utils.jobs import executer, reserver
+
+
+@click.command("jobs-worker")
+@click.option("--once", is_flag=True, help="S'arrête quand la file est vide")
+@click.option("--poll", default=2.0, show_default=True, help="Attente entre deux scrutations (s)")
+@with_appcontext
+def jobs_worker(once, poll):
+    """
+    Exécute les jobs de ardeche.job (POST /api/jobs/...) hors des workers de
+    l'API. Plusieurs instances peuvent tourner en parallèle (SKIP LOCKED).
+    Avec JOBS_WORKERS=0, l'API ne lance plus de pool local.
+    """
+    if not current_app.config["JOBS_DIR"]:
+        raise click.ClickException(
+            "JOBS_DIR (ARDECHE_JOBS_DIR) doit désigner le dossier partagé avec l'API"
+        )
+    while True:
+        job_id = reserver(
+            current_app.config["JOBS_EXPIRATION"], current_app.config["JOBS_MAX_TENTATIVES"]
+        )
+        if job_id is None:
+            if once:
+                return
+            time.sleep(poll)
+            continue
+        click.echo(f"Job {job_id}...")
+        statut = executer(job_id, current_app.config["JOBS_DIR"])
+        click.echo(f"Job {job_id} : {statut}")
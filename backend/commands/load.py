@@ -0,0 +1,203 @@
+import csv
+import io
+import json
+import os
+import struct
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+
+from backend.utils.env import db
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+# Format binaire de COPY (en-tête, fin de flux, NULL)
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+PGCOPY_NULL = struct.pack("!i", -1)
+PG_EPOCH = date(2000, 1, 1)
+
+# Lignes envoyées par morceau du flux COPY
+TAILLE_LOT = 10000
+
+
+class _FluxCopy(io.RawIOBase):
+    """
+    Fichier en lecture seule alimenté par un générateur de bytes, pour que
+    copy_expert lise les données au fil de l'eau sans les charger en mémoire.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _int4(value):
+    if value is None:
+        return PGCOPY_NULL
+    return struct.pack("!ii", 4, value)
+
+
+def _date(value):
+    return struct.pack("!ii", 4, (value - PG_EPOCH).days)
+
+
+def _bytes(value):
+    return struct.pack("!i", len(value)) + value
+
+
+def _point_ewkb(lon, lat, srid=4326):
+    # EWKB little endian : type Point avec drapeau SRID
+    return struct.pack("<BIidd", 1, 0x20000001, srid, lon, lat)
+
+
+def _copy_binaire(cursor, table, columns, tuples):
+    """
+    COPY ... FROM STDIN (FORMAT binary) : tuples produit des listes de champs
+    déjà encodés (_int4, _date, _bytes...).
+    """
+
+    def chunks():
+        yield PGCOPY_HEADER
+        lot = []
+        for champs in tuples:
+            lot.append(struct.pack("!h", len(champs)) + b"".join(champs))
+            if len(lot) >= TAILLE_LOT:
+                yield b"".join(lot)
+                lot = []
+        yield b"".join(lot)
+        yield PGCOPY_TRAILER
+
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)",
+        _FluxCopy(chunks()),
+    )
+
+
+def _charger_sites(cursor, coords_path):
+    with open(coords_path, encoding="utf-8") as fichier:
+        coords = json.load(fichier)
+
+    _copy_binaire(
+        cursor,
+        "ardeche.ecocompteur_site",
+        ("nom", "geom"),
+        (
+            [_bytes(nom.encode()), _bytes(_point_ewkb(site["lon"], site["lat"]))]
+            for nom, site in coords.items()
+        ),
+    )
+    # Ids des sites résolus une seule fois pour tout le chargement des visites
+    cursor.execute("SELECT nom, id FROM ardeche.ecocompteur_site")
+    return dict(cursor.fetchall())
+
+
+def _charger_visites(cursor, ecocompteur_path, site_ids):
+    def tuples():
+        with open(ecocompteur_path, encoding="utf-8", newline="") as fichier:
+            for row in csv.DictReader(fichier):
+                yield [
+                    _int4(site_ids[row["site"]]),
+                    _date(date.fromisoformat(row["time"][:10])),
+                    _int4(round(float(row["count"] or 0))),
+                ]
+
+    _copy_binaire(
+        cursor, "ardeche.ecocompteur_visit", ("site_id", "date", "valeur"), tuples()
+    )
+
+
+def _charger_quiet_zones(cursor, quiet_zone_path):
+    # La géométrie est transmise en EWKT (COPY csv), converti par PostGIS
+    def chunks():
+        sortie = io.StringIO()
+        writer = csv.writer(sortie)
+        with open(quiet_zone_path, encoding="utf-8", newline="") as fichier:
+            for row in csv.DictReader(fichier, delimiter=";"):
+                writer.writerow(
+                    [row["cd_nom"] or None, row["NOM"], f"SRID=4326;{row['WKT']}"]
+                )
+                yield sortie.getvalue().encode()
+                sortie.seek(0)
+                sortie.truncate()
+
+    cursor.copy_expert(
+        "COPY ardeche.quiet_zone (cd_nom, nom_valide, geom) FROM STDIN WITH (FORMAT csv)",
+        _FluxCopy(chunks()),
+    )
+
+
+@click.command("load-data")
+@click.option(
+    "--data-dir",
+    default=DATA_DIR,
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="Dossier contenant ecocompteur.csv, coords.json et zq_rapace_4326.csv",
+)
+@with_appcontext
+def load_data(data_dir):
+    """
+    Charge les éco-compteurs et les zones de quiétude par COPY, en une transaction.
+    Remplace import_ecocompteur_embedded.sql et import_quiet_zone_embedded.sql.
+    """
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+
+        # Réinitialise les tables pour un chargement déterministe
+        cursor.execute(
+            "TRUNCATE ardeche.ecocompteur_visit, ardeche.ecocompteur_site, ardeche.quiet_zone"
+            " RESTART IDENTITY CASCADE"
+        )
+        # Index reconstruit après le chargement plutôt que maintenu ligne à ligne
+        cursor.execute("DROP INDEX IF EXISTS ardeche.idx_ecocompteur_visit_site_id")
+
+        site_ids = _charger_sites(cursor, os.path.join(data_dir, "coords.json"))
+        click.echo(f"{len(site_ids)} sites éco-compteur chargés")
+        _charger_visites(cursor, os.path.join(data_dir, "ecocompteur.csv"), site_ids)
+        click.echo(f"{cursor.rowcount} visites éco-compteur chargées")
+        _charger_quiet_zones(cursor, os.path.join(data_dir, "zq_rapace_4326.csv"))
+        click.echo(f"{cursor.rowcount} zones de quiétude chargées")
+
+        cursor.execute(
+            "CREATE INDEX idx_ecocompteur_visit_site_id"
+            " ON ardeche.ecocompteur_visit(site_id)"
+        )
+        cursor.execute(
+            "SELECT to_regprocedure('ardeche.refresh_ecocompteur_rollup()') IS NOT NULL"
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT ardeche.refresh_ecocompteur_rollup()")
+        cursor.execute("ANALYZE ardeche.ecocompteur_site")
+        cursor.execute("ANALYZE ardeche.ecocompteur_visit")
+        cursor.execute("ANALYZE ardeche.quiet_zone")
+        # Invalide le cache des réponses de l'API
+        cursor.execute(
+            "SELECT to_regprocedure('ardeche.bump_data_version()') IS NOT NULL"
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT ardeche.bump_data_version()")
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    click.echo("Chargement terminé.")
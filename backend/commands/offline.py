@@ -0,0 +1,108 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from backend.utils.env import db
+from backend.utils.passages import passages_par_grille
+from backend.utils.queries import SEUIL_PASSAGES, zones_sensibles_query
+
+DATE = click.DateTime(["%Y-%m-%d"])
+
+
+def _comparer(nom, attendu, obtenu):
+    # attendu, obtenu : {id: valeur} ; renvoie le nombre d'écarts
+    ecarts = {
+        cle for cle in attendu.keys() | obtenu.keys() if attendu.get(cle) != obtenu.get(cle)
+    }
+    if ecarts:
+        exemples = ", ".join(
+            f"{cle}: {attendu.get(cle)} (SQL) / {obtenu.get(cle)}" for cle in sorted(ecarts)[:5]
+        )
+        click.echo(f"ÉCART {nom} : {len(ecarts)} sur {len(attendu)} ({exemples})")
+    else:
+        click.echo(f"OK    {nom} : {len(attendu)} résultats identiques")
+    return len(ecarts)
+
+
+@click.command("offline")
+@click.option("--traces", required=True, type=click.Path(exists=True, dir_okay=False), help="Traces (GeoPackage ou GeoParquet)")
+@click.option("--traces-layer", help="Couche du GeoPackage des traces")
+@click.option("--grille", required=True, type=click.Path(exists=True, dir_okay=False), help="Grille 200m")
+@click.option("--obs", type=click.Path(exists=True, dir_okay=False), help="Observations (active les zones sensibles)")
+@click.option("--quiet-zone", type=click.Path(exists=True, dir_okay=False), help="Zones de quiétude, pour --cd-nom all")
+@click.option("--date-min", required=True, type=DATE)
+@click.option("--date-max", required=True, type=DATE)
+@click.option("--cd-nom", "cd_noms", multiple=True, help="Espèce (option répétable) ou 'all'")
+@click.option("--geometry", default="buffer", type=click.Choice(["buffer", "point"]), show_default=True)
+@click.option("--seuil", default=SEUIL_PASSAGES, show_default=True)
+@click.option("--workers", type=int, help="Nombre de processus (1 : sans pool)")
+@click.option("--output-dir", default=".", type=click.Path(file_okay=False), show_default=True)
+@click.option("--verifier", is_flag=True, help="Compare les résultats aux requêtes SQL de l'API")
+@with_appcontext
+def offline(
+    traces, traces_layer, grille, obs, quiet_zone, date_min, date_max, cd_noms,
+    geometry, seuil, workers, output_dir, verifier,
+):
+    """
+    Calcule passages par maille et zones sensibles hors base (shapely/NumPy),
+    à partir de fichiers, et écrit passages.parquet et zones_sensibles.parquet
+    (GeoParquet, mêmes propriétés que /api/analyse et /api/zones-sensibles).
+    Seul --verifier interroge la base.
+    """
+    try:
+        from backend.offline import analyse, charger_couches, passages_par_maille, zones_sensibles
+        from backend.offline.donnees import lire_couche
+    except ImportError as err:
+        raise click.ClickException(f"Le moteur hors base nécessite le module {err.name}")
+
+    date_min, date_max = date_min.date(), date_max.date()
+    if obs is not None:
+        if list(cd_noms) == ["all"]:
+            if quiet_zone is None:
+                raise click.ClickException("--cd-nom all nécessite --quiet-zone")
+            cd_nom_values = sorted(lire_couche(quiet_zone)["cd_nom"].dropna().astype(int).unique())
+        else:
+            try:
+                cd_nom_values = sorted({int(value) for value in cd_noms})
+            except ValueError:
+                raise click.ClickException("--cd-nom doit être un entier ou 'all'")
+            if not cd_nom_values:
+                raise click.ClickException("--obs nécessite au moins un --cd-nom")
+
+    couches = charger_couches(traces, grille, obs, couche_traces=traces_layer)
+    passages = passages_par_maille(couches, date_min, date_max, workers)
+    os.makedirs(output_dir, exist_ok=True)
+    analyse(couches, date_min, date_max, passages=passages).to_parquet(
+        os.path.join(output_dir, "passages.parquet")
+    )
+    click.echo(f"{len(passages)} mailles, {int(passages.sum())} passages")
+
+    zones = None
+    if obs is not None:
+        zones = zones_sensibles(
+            couches, cd_nom_values, date_min, date_max, geometry, seuil, passages=passages
+        )
+        zones.to_parquet(os.path.join(output_dir, "zones_sensibles.parquet"))
+        click.echo(f"{len(zones)} observations, {int(zones['zone_sensible'].sum())} en zone sensible")
+
+    if not verifier:
+        return
+    sous_requete = passages_par_grille(date_min, date_max)
+    ecarts = _comparer(
+        "passages",
+        dict(db.session.execute(select(sous_requete.c.id, sous_requete.c.nb_passages)).all()),
+        dict(zip(couches.grille_id.tolist(), passages.tolist())),
+    )
+    if zones is not None:
+        sous_requete = zones_sensibles_query(
+            cd_nom_values, date_min, date_max, seuil=seuil
+        ).subquery()
+        ecarts += _comparer(
+            "zones sensibles",
+            dict(db.session.execute(select(sous_requete.c.id, sous_requete.c.nb_passages_max)).all()),
+            dict(zip(zones["id"].tolist(), zones["nb_passages_max"].tolist())),
+        )
+    if ecarts:
+        raise SystemExit(1)
@@ -0,0 +1,147 @@
+import json
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+
+from backend.utils.env import db
+from backend.utils.geojson import geojson_select
+from backend.utils.passages import _passages_jointure
+from backend.utils.queries import analyse_query, obs_grid_query, zones_sensibles_query
+from backend.utils.synthetic import CD_NOMS, generer_donnees, tables_vides
+
+DATE_MIN = date(2022, 6, 1)
+DATE_MAX = date(2022, 8, 31)
+
+# Prédicats spatiaux qui ne doivent pas être évalués en filtre de Nested Loop
+PREDICATS_SPATIAUX = ("&&", "st_intersects", "st_dwithin")
+
+
+def _cas():
+    """
+    Requêtes SQL générées par les routes, avec les parcours séquentiels admis :
+    /api/analyse renvoie toutes les mailles, la grille est donc lue entièrement ;
+    /api/zones-sensibles peut rattacher les passages aux mailles par hash join.
+    """
+    return [
+        (
+            "grid",
+            geojson_select(obs_grid_query(0.01, [CD_NOMS[0]]))[0],
+            set(),
+        ),
+        (
+            "analyse (cube)",
+            geojson_select(analyse_query(DATE_MIN, DATE_MAX))[0],
+            {"grille_200_4326"},
+        ),
+        (
+            "analyse (jointure)",
+            _passages_jointure(DATE_MIN, DATE_MAX),
+            {"grille_200_4326"},
+        ),
+        (
+            "zones-sensibles",
+            geojson_select(zones_sensibles_query([CD_NOMS[0]], DATE_MIN, DATE_MAX))[0],
+            {"grille_200_4326"},
+        ),
+        (
+            "zones-sensibles batch",
+            geojson_select(zones_sensibles_query(list(CD_NOMS[:3]), DATE_MIN, DATE_MAX))[0],
+            {"grille_200_4326"},
+        ),
+    ]
+
+
+def _noeuds(plan):
+    yield plan
+    for enfant in plan.get("Plans", []):
+        yield from _noeuds(enfant)
+
+
+def verifier_plan(plan, seq_scans_admis) -> list[str]:
+    """
+    Problèmes relevés dans un plan EXPLAIN (FORMAT JSON) : parcours séquentiel
+    d'une table non admise, ou jointure spatiale en Nested Loop sans index.
+    """
+    problemes = []
+    for noeud in _noeuds(plan):
+        if noeud["Node Type"] == "Seq Scan" and noeud["Relation Name"] not in seq_scans_admis:
+            problemes.append(f"Seq Scan sur {noeud['Relation Name']}")
+        join_filter = noeud.get("Join Filter", "").lower()
+        if noeud["Node Type"] == "Nested Loop" and any(
+            predicat in join_filter for predicat in PREDICATS_SPATIAUX
+        ):
+            problemes.append(f"Nested Loop spatial sans index : {noeud['Join Filter']}")
+    return problemes
+
+
+def _explain(stmt):
+    compiled = stmt.compile(dialect=db.engine.dialect)
+    result = db.session.connection().exec_driver_sql(
+        "EXPLAIN (ANALYZE, FORMAT JSON) " + str(compiled), compiled.params
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def base_de_test(nom) -> bool:
+    # Seules les bases dont le nom contient "test" reçoivent des données synthétiques
+    return nom is not None and "test" in nom.lower()
+
+
+def amorcer(scale, force):
+    """
+    Remplit la base avec des données synthétiques (backend/utils/synthetic.py),
+    en refusant une base qui n'est pas une base de test, et d'écraser des
+    tables non vides sans force.
+    """
+    nom = db.engine.url.database
+    if not base_de_test(nom):
+        raise click.ClickException(
+            f"--seed refusé sur la base '{nom}' : son nom doit contenir 'test' "
+            "(DATABASE_URL=postgresql://.../hackathon_test)"
+        )
+    connection = db.engine.raw_connection()
+    try:
+        if not force and not tables_vides(connection.cursor()):
+            raise click.ClickException(
+                "Les tables contiennent déjà des données (--force pour les remplacer)"
+            )
+        generer_donnees(connection, scale)
+    finally:
+        connection.close()
+    # Nouvelles connexions pour prendre en compte le search_path de la base
+    db.engine.dispose()
+
+
+@click.command("check-plans")
+@click.option("--seed", is_flag=True, help="Génère d'abord des données synthétiques")
+@click.option("--scale", default=1.0, show_default=True, help="Échelle des données générées")
+@click.option("--force", is_flag=True, help="Autorise --seed à vider des tables non vides")
+@with_appcontext
+def check_plans(seed, scale, force):
+    """
+    Exécute EXPLAIN ANALYZE sur les requêtes des routes et échoue si un
+    parcours séquentiel ou une jointure spatiale sans index réapparaît.
+    À lancer sur une base PostGIS locale, jamais en production avec --seed.
+    """
+    if seed:
+        amorcer(scale, force)
+
+    echecs = 0
+    for nom, stmt, seq_scans_admis in _cas():
+        plan = _explain(stmt)
+        problemes = verifier_plan(plan, seq_scans_admis)
+        db.session.rollback()
+        if problemes:
+            echecs += 1
+            click.echo(f"ÉCHEC {nom} ({plan['Actual Total Time']:.1f} ms)")
+            for probleme in problemes:
+                click.echo(f"    {probleme}")
+        else:
+            click.echo(f"OK    {nom} ({plan['Actual Total Time']:.1f} ms)")
+
+    if echecs:
+        raise SystemExit(1)
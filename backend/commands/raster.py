@@ -0,0 +1,76 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from backend.utils.env import db
+from backend.utils.raster import RASTER_DIR
+
+DATE = click.DateTime(["%Y-%m-%d"])
+
+
+def _dossier(output_dir):
+    return output_dir or current_app.config.get("RASTER_PASSAGES_DIR") or RASTER_DIR
+
+
+@click.group("raster")
+def raster():
+    """Cube raster des passages par jour et par maille (200m)."""
+
+
+@raster.command("build")
+@click.option("--output-dir", type=click.Path(file_okay=False), help="Dossier du cube (RASTER_PASSAGES_DIR par défaut)")
+@click.option("--workers", type=int, help="Nombre de processus (1 : sans pool)")
+@with_appcontext
+def build(output_dir, workers):
+    """
+    Rasterise les traces de la base sur la grille : utilisé ensuite par
+    /api/analyse quand le cube grille_passage est périmé, tant que les traces
+    et la grille ne changent pas. À relancer après import_gpkg.
+    """
+    try:
+        import geopandas as gpd
+
+        from backend.offline import Couches
+        from backend.offline.raster import construire_cube
+    except ImportError as err:
+        raise click.ClickException(f"Le cube raster nécessite le module {err.name}")
+
+    with db.engine.connect() as connexion:
+        traces = gpd.read_postgis(
+            "SELECT id, date_start, geom FROM ardeche.trace", connexion, geom_col="geom", crs=4326
+        )
+        grille = gpd.read_postgis(
+            "SELECT id, geom FROM ardeche.grille_200_4326", connexion, geom_col="geom", crs=4326
+        )
+    # États des traces et de la grille lues, comparés par l'API à ceux des tables
+    etat = (len(traces), int(traces["id"].max()) if len(traces) else None)
+    etat_grille = (len(grille), int(grille["id"].max()) if len(grille) else None)
+    meta = construire_cube(
+        Couches(traces, grille), _dossier(output_dir), etat, etat_grille, workers
+    )
+    click.echo(
+        f"Cube de {meta['nb_jours']} jours × {len(grille)} mailles"
+        f" depuis le {meta['date_debut']} écrit dans {_dossier(output_dir)}"
+    )
+
+
+@raster.command("export")
+@click.option("--date-min", required=True, type=DATE)
+@click.option("--date-max", required=True, type=DATE)
+@click.option("--output", required=True, type=click.Path(dir_okay=False), help="Fichier GeoTIFF")
+@click.option("--input-dir", type=click.Path(file_okay=False), help="Dossier du cube (RASTER_PASSAGES_DIR par défaut)")
+@with_appcontext
+def export(date_min, date_max, output, input_dir):
+    """Exporte les passages par maille sur une période en GeoTIFF (QGIS)."""
+    from backend.utils.raster import charger_cube
+
+    cube = charger_cube(_dossier(input_dir))
+    if cube is None:
+        raise click.ClickException("Cube raster absent (flask raster build)")
+    try:
+        from backend.offline.raster import ecrire_geotiff
+
+        ecrire_geotiff(cube, date_min.date(), date_max.date(), output)
+    except ImportError as err:
+        raise click.ClickException(f"L'export GeoTIFF nécessite le module {err.name}")
+    click.echo(f"GeoTIFF écrit dans {output}")
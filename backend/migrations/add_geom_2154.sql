@@ -0,0 +1,21 @@
+-- Géométries projetées en Lambert-93 (EPSG:2154), calculées par PostgreSQL.
+-- Le test de sensibilité de /api/zones-sensibles devient un ST_DWithin(obs, grille, 50)
+-- en mètres, servi par les index GiST, au lieu de buffers recalculés à chaque requête.
+
+BEGIN;
+
+ALTER TABLE ardeche.obs
+    ADD COLUMN IF NOT EXISTS geom_2154 geometry(POINT, 2154)
+    GENERATED ALWAYS AS (ST_Transform(geom, 2154)) STORED;
+CREATE INDEX IF NOT EXISTS idx_obs_geom_2154 ON ardeche.obs USING GIST (geom_2154);
+
+ALTER TABLE ardeche.grille_200_4326
+    ADD COLUMN IF NOT EXISTS geom_2154 geometry(MULTIPOLYGON, 2154)
+    GENERATED ALWAYS AS (ST_Transform(geom, 2154)) STORED;
+CREATE INDEX IF NOT EXISTS idx_grille_200_4326_geom_2154
+    ON ardeche.grille_200_4326 USING GIST (geom_2154);
+
+ANALYZE ardeche.obs;
+ANALYZE ardeche.grille_200_4326;
+
+COMMIT;
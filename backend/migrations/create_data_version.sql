@@ -0,0 +1,24 @@
+-- Version des données, incrémentée par chaque commande d'import.
+-- Le cache des réponses de l'API (backend/utils/cache.py) l'inclut dans ses clés :
+-- un import rend toutes les entrées précédentes obsolètes.
+
+BEGIN;
+
+CREATE SCHEMA IF NOT EXISTS ardeche;
+
+CREATE TABLE IF NOT EXISTS ardeche.data_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+INSERT INTO ardeche.data_version DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION ardeche.bump_data_version() RETURNS bigint
+LANGUAGE sql AS $$
+    INSERT INTO ardeche.data_version DEFAULT VALUES
+    ON CONFLICT (id) DO UPDATE
+        SET version = ardeche.data_version.version + 1, updated_at = now()
+    RETURNING version;
+$$;
+
+COMMIT;
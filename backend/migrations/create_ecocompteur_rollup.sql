@@ -0,0 +1,37 @@
+-- Agrégats des éco-compteurs par site et par jour/semaine/mois/année.
+-- Servent /api/ecocompteur sans GROUP BY date_trunc sur les visites à chaque requête.
+-- À recalculer après chaque import : SELECT ardeche.refresh_ecocompteur_rollup();
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ardeche.ecocompteur_rollup (
+    resolution TEXT NOT NULL CHECK (resolution IN ('day', 'week', 'month', 'year')),
+    site_id INTEGER NOT NULL REFERENCES ardeche.ecocompteur_site(id) ON DELETE CASCADE,
+    periode DATE NOT NULL,  -- premier jour de la période
+    valeur BIGINT NOT NULL,
+    PRIMARY KEY (resolution, site_id, periode)
+);
+
+CREATE OR REPLACE FUNCTION ardeche.refresh_ecocompteur_rollup() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE ardeche.ecocompteur_rollup;
+
+    INSERT INTO ardeche.ecocompteur_rollup (resolution, site_id, periode, valeur)
+    SELECT 'day', site_id, date, sum(valeur)
+    FROM ardeche.ecocompteur_visit
+    GROUP BY site_id, date;
+
+    -- Les résolutions plus larges sont agrégées depuis les totaux journaliers
+    INSERT INTO ardeche.ecocompteur_rollup (resolution, site_id, periode, valeur)
+    SELECT resolution.nom, jour.site_id, date_trunc(resolution.nom, jour.periode)::date, sum(jour.valeur)
+    FROM ardeche.ecocompteur_rollup jour
+    CROSS JOIN (VALUES ('week'), ('month'), ('year')) AS resolution(nom)
+    WHERE jour.resolution = 'day'
+    GROUP BY resolution.nom, jour.site_id, date_trunc(resolution.nom, jour.periode);
+
+    ANALYZE ardeche.ecocompteur_rollup;
+END;
+$$;
+
+COMMIT;
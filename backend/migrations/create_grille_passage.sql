@@ -0,0 +1,150 @@
+-- Cube pré-calculé des passages par maille et par jour (grille × trace).
+-- /api/analyse et /api/zones-sensibles y lisent les nb_passages d'une fenêtre
+-- de dates sans refaire la jointure spatiale à chaque requête.
+-- À reconstruire après chaque import_gpkg : SELECT ardeche.refresh_grille_passage();
+-- Après un import en ajout (import_gpkg_append) : SELECT ardeche.append_grille_passage();
+
+BEGIN;
+
+CREATE SCHEMA IF NOT EXISTS ardeche;
+
+-- nb_passages : traces démarrant ce jour-là et intersectant la maille
+-- nb_passages_cumul : somme courante par maille, une fenêtre [d1, d2] vaut
+-- cumul(dernier jour <= d2) - cumul(dernier jour < d1)
+CREATE TABLE IF NOT EXISTS ardeche.grille_passage (
+    grille_id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    nb_passages INTEGER NOT NULL,
+    nb_passages_cumul BIGINT NOT NULL,
+    PRIMARY KEY (grille_id, date)
+);
+
+-- État du cube : permet de détecter qu'il est périmé par rapport à ardeche.trace
+CREATE TABLE IF NOT EXISTS ardeche.grille_passage_etat (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    trace_count BIGINT NOT NULL,
+    trace_max_id INTEGER,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Reconstruction complète du cube depuis ardeche.trace
+CREATE OR REPLACE FUNCTION ardeche.refresh_grille_passage() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE ardeche.grille_passage;
+
+    INSERT INTO ardeche.grille_passage (grille_id, date, nb_passages, nb_passages_cumul)
+    SELECT
+        jour.grille_id,
+        jour.date,
+        jour.nb_passages,
+        sum(jour.nb_passages) OVER (PARTITION BY jour.grille_id ORDER BY jour.date)
+    FROM (
+        SELECT g.id AS grille_id, t.date_start AS date, count(*) AS nb_passages
+        FROM ardeche.grille_200_4326 g
+        JOIN ardeche.trace t
+            ON g.geom && t.geom AND ST_Intersects(g.geom, t.geom)
+        WHERE t.date_start IS NOT NULL
+        GROUP BY g.id, t.date_start
+    ) AS jour;
+
+    DELETE FROM ardeche.grille_passage_etat;
+    INSERT INTO ardeche.grille_passage_etat (trace_count, trace_max_id)
+    SELECT count(*), max(id) FROM ardeche.trace;
+
+    ANALYZE ardeche.grille_passage;
+END;
+$$;
+
+-- Ajout incrémental des traces d'id supérieur au dernier id traité (trace_max_id).
+-- Le coût est proportionnel aux nouvelles traces : seules les mailles qu'elles
+-- touchent sont mises à jour, et le cumul n'est recalculé qu'à partir de leur
+-- premier jour modifié. Retourne le nombre de traces ajoutées.
+-- Les traces ajoutées doivent avoir des id supérieurs à ceux déjà chargés
+-- (import_gpkg_append copie les id du GeoPackage) : sinon la fonction échoue
+-- et le cube doit être recalculé (refresh_grille_passage).
+CREATE OR REPLACE FUNCTION ardeche.append_grille_passage() RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    watermark INTEGER;
+    nb_cube BIGINT;
+    nb_total BIGINT;
+    nb_traces INTEGER;
+    nouveau_max_id INTEGER;
+BEGIN
+    SELECT trace_max_id, trace_count INTO watermark, nb_cube
+    FROM ardeche.grille_passage_etat FOR UPDATE;
+    IF NOT FOUND THEN
+        -- Pas encore de cube : calcul complet
+        PERFORM ardeche.refresh_grille_passage();
+        SELECT trace_count INTO nb_traces FROM ardeche.grille_passage_etat;
+        RETURN nb_traces;
+    END IF;
+
+    SELECT count(*), max(id) INTO nb_traces, nouveau_max_id
+    FROM ardeche.trace
+    WHERE id > coalesce(watermark, 0);
+
+    -- Traces d'id <= trace_max_id ajoutées (ou traces supprimées) : elles
+    -- seraient ignorées par le calcul incrémental
+    SELECT count(*) INTO nb_total FROM ardeche.trace;
+    IF nb_total <> nb_cube + nb_traces THEN
+        RAISE EXCEPTION 'append_grille_passage : % traces en base, % attendues (id des traces ajoutées <= %)',
+            nb_total, nb_cube + nb_traces, watermark
+            USING HINT = 'Recalculer le cube : SELECT ardeche.refresh_grille_passage(); (make refresh_passages)';
+    END IF;
+    IF nb_traces = 0 THEN
+        RETURN 0;
+    END IF;
+
+    CREATE TEMP TABLE nouveaux_passages ON COMMIT DROP AS
+    SELECT g.id AS grille_id, t.date_start AS date, count(*) AS nb_passages
+    FROM ardeche.trace t
+    JOIN ardeche.grille_200_4326 g
+        ON g.geom && t.geom AND ST_Intersects(g.geom, t.geom)
+    WHERE t.id > coalesce(watermark, 0) AND t.date_start IS NOT NULL
+    GROUP BY g.id, t.date_start;
+
+    INSERT INTO ardeche.grille_passage AS gp (grille_id, date, nb_passages, nb_passages_cumul)
+    SELECT grille_id, date, nb_passages, 0 FROM nouveaux_passages
+    ON CONFLICT (grille_id, date)
+        DO UPDATE SET nb_passages = gp.nb_passages + EXCLUDED.nb_passages;
+
+    -- Cumul = cumul du dernier jour inchangé + somme courante des jours suivants
+    UPDATE ardeche.grille_passage gp
+    SET nb_passages_cumul = recalcul.cumul
+    FROM (
+        SELECT
+            p.grille_id,
+            p.date,
+            coalesce((
+                SELECT prec.nb_passages_cumul
+                FROM ardeche.grille_passage prec
+                WHERE prec.grille_id = p.grille_id AND prec.date < touchees.date_min
+                ORDER BY prec.date DESC
+                LIMIT 1
+            ), 0)
+            + sum(p.nb_passages) OVER (PARTITION BY p.grille_id ORDER BY p.date) AS cumul
+        FROM ardeche.grille_passage p
+        JOIN (
+            SELECT grille_id, min(date) AS date_min
+            FROM nouveaux_passages
+            GROUP BY grille_id
+        ) AS touchees
+            ON touchees.grille_id = p.grille_id AND p.date >= touchees.date_min
+    ) AS recalcul
+    WHERE gp.grille_id = recalcul.grille_id AND gp.date = recalcul.date;
+
+    UPDATE ardeche.grille_passage_etat
+    SET trace_count = trace_count + nb_traces,
+        trace_max_id = nouveau_max_id,
+        updated_at = now();
+
+    -- Supprimée tout de suite : un second appel dans la même transaction la recrée
+    DROP TABLE nouveaux_passages;
+
+    RETURN nb_traces;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,30 @@
+-- Index spatiaux et B-tree utilisés par les routes de l'API.
+-- Les pré-filtres && de /api/analyse et /api/zones-sensibles, les filtres
+-- cd_nom/date_debut et les fenêtres de dates sur les traces s'appuient dessus.
+-- Vérification des plans : flask --app backend.app check-plans
+
+BEGIN;
+
+-- Observations : emprise (&&), filtre espèce + période
+CREATE INDEX IF NOT EXISTS idx_obs_geom ON ardeche.obs USING GIST (geom);
+CREATE INDEX IF NOT EXISTS idx_obs_cd_nom_date_debut ON ardeche.obs (cd_nom, date_debut);
+
+-- Traces : jointure spatiale avec la grille, fenêtre de dates.
+-- BRIN : les traces sont importées dans l'ordre chronologique (ogr2ogr),
+-- l'index reste minuscule et élimine les blocs hors période.
+CREATE INDEX IF NOT EXISTS idx_trace_geom ON ardeche.trace USING GIST (geom);
+CREATE INDEX IF NOT EXISTS idx_trace_date_start ON ardeche.trace USING BRIN (date_start);
+
+-- Grille : jointure spatiale avec les traces, emprise des tuiles
+CREATE INDEX IF NOT EXISTS idx_grille_200_4326_geom ON ardeche.grille_200_4326 USING GIST (geom);
+
+-- Zones de quiétude : liste des espèces, emprise
+CREATE INDEX IF NOT EXISTS idx_quiet_zone_geom ON ardeche.quiet_zone USING GIST (geom);
+CREATE INDEX IF NOT EXISTS idx_quiet_zone_cd_nom ON ardeche.quiet_zone (cd_nom);
+
+ANALYZE ardeche.obs;
+ANALYZE ardeche.trace;
+ANALYZE ardeche.grille_200_4326;
+ANALYZE ardeche.quiet_zone;
+
+COMMIT;
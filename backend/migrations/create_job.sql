@@ -0,0 +1,37 @@
+-- File de traitements longs (POST /api/jobs/zones-sensibles), sans broker externe.
+-- Les workers (pool local de l'API ou flask jobs-worker) réservent les jobs en
+-- attente avec FOR UPDATE SKIP LOCKED ; l'index unique partiel sur cle fait
+-- partager un même job aux demandes identiques tant qu'il n'est pas terminé.
+
+BEGIN;
+
+CREATE SCHEMA IF NOT EXISTS ardeche;
+
+CREATE TABLE IF NOT EXISTS ardeche.job (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    type TEXT NOT NULL,
+    parametres JSONB NOT NULL,
+    -- Empreinte du type, des paramètres normalisés et de la version des données
+    cle TEXT NOT NULL,
+    statut TEXT NOT NULL DEFAULT 'en_attente'
+        CHECK (statut IN ('en_attente', 'en_cours', 'termine', 'erreur')),
+    -- Nombre de réservations : un job qui fait tomber ses workers passe en
+    -- erreur après JOBS_MAX_TENTATIVES au lieu d'être repris indéfiniment
+    tentatives INTEGER NOT NULL DEFAULT 0,
+    resultat TEXT,
+    erreur TEXT,
+    cree_le TIMESTAMPTZ NOT NULL DEFAULT now(),
+    demarre_le TIMESTAMPTZ,
+    termine_le TIMESTAMPTZ
+);
+
+-- Tables créées avant l'ajout de la colonne
+ALTER TABLE ardeche.job ADD COLUMN IF NOT EXISTS tentatives INTEGER NOT NULL DEFAULT 0;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_job_cle_actif
+    ON ardeche.job (cle) WHERE statut IN ('en_attente', 'en_cours');
+CREATE INDEX IF NOT EXISTS idx_job_cle ON ardeche.job (cle, termine_le);
+CREATE INDEX IF NOT EXISTS idx_job_en_attente
+    ON ardeche.job (cree_le) WHERE statut IN ('en_attente', 'en_cours');
+
+COMMIT;
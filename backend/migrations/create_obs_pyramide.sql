@@ -0,0 +1,87 @@
+-- Pyramide des observations pour /api/grid : nombre d'observations par maille,
+-- espèce et mois, sur une échelle fixe de résolutions (degrés WGS84) :
+-- niveau 0 = 0.001, 1 = 0.002, 2 = 0.01, 3 = 0.02, 4 = 0.1.
+-- Une maille (ix, iy) du niveau n couvre [ix, ix + 1[ × taille_n en longitude
+-- (idem en latitude). Chaque niveau est un multiple entier du précédent : les
+-- niveaux grossiers sont agrégés depuis le niveau inférieur, sans relire obs.
+-- Doit rester cohérent avec NIVEAUX_GRILLE (backend/utils/pyramide.py).
+-- À reconstruire après chaque import d'observations : SELECT ardeche.refresh_obs_pyramide();
+
+BEGIN;
+
+CREATE SCHEMA IF NOT EXISTS ardeche;
+
+CREATE TABLE IF NOT EXISTS ardeche.obs_pyramide (
+    niveau SMALLINT NOT NULL,
+    ix INTEGER NOT NULL,
+    iy INTEGER NOT NULL,
+    cd_nom INTEGER,
+    annee_mois DATE,
+    nb INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_obs_pyramide_niveau_cd_nom
+    ON ardeche.obs_pyramide (niveau, cd_nom, annee_mois);
+
+-- Présence d'une ligne = pyramide à jour ; vidée par tout changement sur obs
+CREATE TABLE IF NOT EXISTS ardeche.obs_pyramide_etat (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION ardeche.refresh_obs_pyramide() RETURNS void
+LANGUAGE plpgsql AS $$
+DECLARE
+    -- Facteur de chaque niveau par rapport au niveau 0 (0.001°)
+    facteurs INTEGER[] := ARRAY[1, 2, 10, 20, 100];
+    n INTEGER;
+BEGIN
+    TRUNCATE ardeche.obs_pyramide;
+
+    INSERT INTO ardeche.obs_pyramide (niveau, ix, iy, cd_nom, annee_mois, nb)
+    SELECT
+        0,
+        floor(ST_X(geom) / 0.001)::int,
+        floor(ST_Y(geom) / 0.001)::int,
+        cd_nom,
+        date_trunc('month', date_debut)::date,
+        count(*)
+    FROM ardeche.obs
+    WHERE geom IS NOT NULL
+    GROUP BY 2, 3, 4, 5;
+
+    FOR n IN 1 .. array_length(facteurs, 1) - 1 LOOP
+        INSERT INTO ardeche.obs_pyramide (niveau, ix, iy, cd_nom, annee_mois, nb)
+        SELECT
+            n,
+            floor(ix / (facteurs[n + 1] / facteurs[n])::float8)::int,
+            floor(iy / (facteurs[n + 1] / facteurs[n])::float8)::int,
+            cd_nom,
+            annee_mois,
+            sum(nb)
+        FROM ardeche.obs_pyramide
+        WHERE niveau = n - 1
+        GROUP BY 2, 3, 4, 5;
+    END LOOP;
+
+    DELETE FROM ardeche.obs_pyramide_etat;
+    INSERT INTO ardeche.obs_pyramide_etat DEFAULT VALUES;
+
+    ANALYZE ardeche.obs_pyramide;
+END;
+$$;
+
+-- Toute modification de obs rend la pyramide périmée (l'API repasse en calcul direct)
+CREATE OR REPLACE FUNCTION ardeche.obs_pyramide_perimee() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM ardeche.obs_pyramide_etat;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS obs_pyramide_perimee ON ardeche.obs;
+CREATE TRIGGER obs_pyramide_perimee
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ardeche.obs
+    FOR EACH STATEMENT EXECUTE FUNCTION ardeche.obs_pyramide_perimee();
+
+COMMIT;
@@ -1,3 +1,10 @@
-from backend.models.ecocompteur import EcoCompteurSite, EcoCompteurVisit
+from backend.models.ecocompteur import (
+    EcoCompteurRollup,
+    EcoCompteurSite,
+    EcoCompteurVisit,
+)
+from backend.models.grille_passage import GrillePassage, GrillePassageEtat
+from backend.models.job import Job
 from backend.models.obs import Obs
+from backend.models.obs_pyramide import ObsPyramide, ObsPyramideEtat
 from backend.models.quiet_zone import QuietZone
@@ -23,3 +23,19 @@ class EcoCompteurVisit(db.Model):
     valeur = db.Column(db.Integer, nullable=False)
 
     site = db.relationship("EcoCompteurSite", backref=db.backref("visits", lazy=True))
+
+
+class EcoCompteurRollup(db.Model):
+    """
+    Visites agrégées par site et par période (jour, semaine, mois, année)
+    """
+
+    __tablename__ = "ecocompteur_rollup"
+    __table_args__ = {"schema": "ardeche"}
+
+    resolution = db.Column(db.Unicode, primary_key=True)
+    site_id = db.Column(
+        db.Integer, db.ForeignKey("ardeche.ecocompteur_site.id"), primary_key=True
+    )
+    periode = db.Column(db.Date, primary_key=True)
+    valeur = db.Column(db.BigInteger, nullable=False)
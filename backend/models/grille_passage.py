@@ -0,0 +1,29 @@
+from backend.utils.env import db
+
+
+class GrillePassage(db.Model):
+    """
+    Cube des passages par maille et par jour
+    """
+
+    __tablename__ = "grille_passage"
+    __table_args__ = {"schema": "ardeche"}
+
+    grille_id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    nb_passages = db.Column(db.Integer, nullable=False)
+    nb_passages_cumul = db.Column(db.BigInteger, nullable=False)
+
+
+class GrillePassageEtat(db.Model):
+    """
+    Etat du cube (traces prises en compte lors du dernier calcul)
+    """
+
+    __tablename__ = "grille_passage_etat"
+    __table_args__ = {"schema": "ardeche"}
+
+    id = db.Column(db.Boolean, primary_key=True, default=True)
+    trace_count = db.Column(db.BigInteger, nullable=False)
+    trace_max_id = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime(timezone=True))
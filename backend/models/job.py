@@ -0,0 +1,23 @@
+from backend.utils.env import db
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class Job(db.Model):
+    """
+    Traitement long exécuté en arrière-plan (résultat en GeoParquet)
+    """
+
+    __tablename__ = "job"
+    __table_args__ = {"schema": "ardeche"}
+
+    id = db.Column(db.Uuid, primary_key=True, server_default=db.text("gen_random_uuid()"))
+    type = db.Column(db.String, nullable=False)
+    parametres = db.Column(JSONB, nullable=False)
+    cle = db.Column(db.String, nullable=False)
+    statut = db.Column(db.String, nullable=False, server_default="en_attente")
+    tentatives = db.Column(db.Integer, nullable=False, server_default="0")
+    resultat = db.Column(db.String)
+    erreur = db.Column(db.String)
+    cree_le = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    demarre_le = db.Column(db.DateTime(timezone=True))
+    termine_le = db.Column(db.DateTime(timezone=True))
@@ -11,6 +11,10 @@ class Obs(db.Model):
     __tablename__ = "obs"
     id = db.Column(db.Integer, primary_key=True)
     geom = db.Column(Geometry("POINT", srid=4326))
+    # Colonne générée (migrations/add_geom_2154.sql), en mètres pour ST_DWithin
+    geom_2154 = db.Column(
+        Geometry("POINT", srid=2154), db.Computed("ST_Transform(geom, 2154)")
+    )
     cd_nom = db.Column(db.Integer)
     group2_inpn = db.Column(db.String)
     niveau_sensibilite = db.Column(db.String)
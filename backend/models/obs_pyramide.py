@@ -0,0 +1,32 @@
+from backend.utils.env import db
+
+
+class ObsPyramide(db.Model):
+    """
+    Pyramide des observations par niveau, maille, espèce et mois
+    """
+
+    __tablename__ = "obs_pyramide"
+    __table_args__ = {"schema": "ardeche"}
+
+    niveau = db.Column(db.SmallInteger, nullable=False)
+    ix = db.Column(db.Integer, nullable=False)
+    iy = db.Column(db.Integer, nullable=False)
+    cd_nom = db.Column(db.Integer)
+    annee_mois = db.Column(db.Date)
+    nb = db.Column(db.Integer, nullable=False)
+
+    # Pas de clé primaire en base (cd_nom peut être NULL) : identité pour l'ORM
+    __mapper_args__ = {"primary_key": [niveau, ix, iy, cd_nom, annee_mois]}
+
+
+class ObsPyramideEtat(db.Model):
+    """
+    Etat de la pyramide (ligne présente tant que obs n'a pas changé)
+    """
+
+    __tablename__ = "obs_pyramide_etat"
+    __table_args__ = {"schema": "ardeche"}
+
+    id = db.Column(db.Boolean, primary_key=True, default=True)
+    updated_at = db.Column(db.DateTime(timezone=True))
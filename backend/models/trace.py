@@ -22,4 +22,8 @@ class Grille(db.Model):
 
     __tablename__ = "grille_200_4326"
     id = db.Column(db.Integer, primary_key=True)
-    geom = db.Column(Geometry("MULTIPOLYGON"))
\ No newline at end of file
+    geom = db.Column(Geometry("MULTIPOLYGON"))
+    # Colonne générée (migrations/add_geom_2154.sql), en mètres pour ST_DWithin
+    geom_2154 = db.Column(
+        Geometry("MULTIPOLYGON", srid=2154), db.Computed("ST_Transform(geom, 2154)")
+    )
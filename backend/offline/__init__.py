@@ -0,0 +1,2 @@
+from backend.offline.donnees import Couches, charger_couches
+from backend.offline.moteur import analyse, passages_par_maille, zones_sensibles
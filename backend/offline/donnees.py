@@ -0,0 +1,65 @@
+import os
+
+import geopandas as gpd
+import numpy as np
+
+# Projection métrique des tests de distance, comme geom_2154 en base
+SRID_METRIQUE = 2154
+
+
+def lire_couche(chemin, couche=None):
+    # GeoParquet (.parquet) ou tout format lu par GDAL (GeoPackage, FlatGeobuf...)
+    if os.path.splitext(chemin)[1].lower() in (".parquet", ".geoparquet"):
+        gdf = gpd.read_parquet(chemin)
+    else:
+        gdf = gpd.read_file(chemin, layer=couche)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(4326)
+    return gdf.to_crs(4326)
+
+
+class Couches:
+    """
+    Traces, grille et observations en tableaux NumPy/shapely, dans le format
+    des tables trace, grille_200_4326 et obs (géométries en WGS84, plus leur
+    projection Lambert-93 pour la grille et les observations).
+    """
+
+    def __init__(self, traces, grille, obs=None):
+        traces = traces[traces.geometry.notna() & ~traces.geometry.is_empty]
+        self.traces_geom = traces.geometry.to_numpy()
+        self.traces_date = traces["date_start"].to_numpy().astype("datetime64[D]")
+
+        # Mailles sans géométrie ignorées, comme dans passages_par_grille
+        grille = grille[grille.geometry.notna()].sort_values("id")
+        self.grille = grille
+        self.grille_id = grille["id"].to_numpy()
+        self.grille_geom = grille.geometry.to_numpy()
+        self.grille_geom_2154 = grille.geometry.to_crs(SRID_METRIQUE).to_numpy()
+
+        self.obs = None
+        if obs is not None:
+            obs = obs[obs.geometry.notna()].sort_values("id")
+            self.obs = obs
+            self.obs_id = obs["id"].to_numpy()
+            self.obs_cd_nom = obs["cd_nom"].to_numpy()
+            self.obs_date = obs["date_debut"].to_numpy().astype("datetime64[ns]")
+            self.obs_geom_2154 = obs.geometry.to_crs(SRID_METRIQUE).to_numpy()
+
+
+def charger_couches(traces, grille, obs=None, couche_traces=None):
+    """
+    Charge les couches depuis des fichiers GeoParquet ou GeoPackage.
+    couche_traces : nom de la couche du GeoPackage des traces (ogr2ogr).
+    """
+    return Couches(
+        lire_couche(traces, couche_traces),
+        lire_couche(grille),
+        lire_couche(obs) if obs is not None else None,
+    )
+
+
+def fenetre_dates(dates, date_min, date_max):
+    # Masque date_min <= date <= date_max (bornes converties à l'unité des dates)
+    unite = np.datetime_data(dates.dtype)[0]
+    return (dates >= np.datetime64(date_min, unite)) & (dates <= np.datetime64(date_max, unite))
@@ -0,0 +1,116 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from backend.offline.donnees import SRID_METRIQUE, fenetre_dates
+from backend.utils.queries import BUFFER_METRES, SEUIL_PASSAGES
+
+# Taille des lots de traces répartis entre les processus
+JOURS_PAR_LOT = 31
+
+# Index de la grille propre à chaque processus du pool
+_arbre_grille = None
+
+
+def _init_processus(grille_geom):
+    global _arbre_grille
+    _arbre_grille = STRtree(grille_geom)
+
+
+def _compter_lot(traces_geom, nb_mailles):
+    # Paires (trace, maille) qui s'intersectent, comptées par maille
+    _, idx_mailles = _arbre_grille.query(traces_geom, predicate="intersects")
+    return np.bincount(idx_mailles, minlength=nb_mailles)
+
+
+def passages_par_maille(couches, date_min, date_max, workers=None, jours_par_lot=JOURS_PAR_LOT):
+    """
+    Nombre de traces démarrant entre date_min et date_max qui intersectent
+    chaque maille (même résultat que passages_par_grille), dans l'ordre de
+    couches.grille_id. Les traces sont réparties par lots de dates entre
+    workers processus (workers=1 : calcul dans le processus courant).
+    """
+    nb_mailles = len(couches.grille_geom)
+    total = np.zeros(nb_mailles, dtype=np.int64)
+
+    masque = fenetre_dates(couches.traces_date, date_min, date_max)
+    geoms = couches.traces_geom[masque]
+    if not len(geoms):
+        return total
+    numeros = (couches.traces_date[masque] - np.datetime64(date_min, "D")).astype(int)
+    numeros //= jours_par_lot
+    lots = [geoms[numeros == numero] for numero in np.unique(numeros)]
+
+    if workers == 1 or len(lots) == 1:
+        _init_processus(couches.grille_geom)
+        comptes = map(_compter_lot, lots, [nb_mailles] * len(lots))
+        return sum(comptes, total)
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_processus, initargs=(couches.grille_geom,)
+    ) as pool:
+        return sum(pool.map(_compter_lot, lots, [nb_mailles] * len(lots)), total)
+
+
+def analyse(couches, date_min, date_max, workers=None, passages=None):
+    # Équivalent de /api/analyse : id, nb_passages et géométrie de chaque maille
+    if passages is None:
+        passages = passages_par_maille(couches, date_min, date_max, workers)
+    return gpd.GeoDataFrame(
+        {"id": couches.grille_id, "nb_passages": passages},
+        geometry=couches.grille_geom,
+        crs=4326,
+    )
+
+
+def zones_sensibles(
+    couches,
+    cd_nom_values,
+    date_min,
+    date_max,
+    geometrie="buffer",
+    seuil=SEUIL_PASSAGES,
+    workers=None,
+    passages=None,
+):
+    """
+    Équivalent de /api/zones-sensibles (et /batch) : pour chaque observation
+    des espèces sur la période, nb_passages maximal des mailles à moins de 50m
+    en Lambert-93 et zone_sensible = nb_passages_max > seuil.
+    passages : résultat de passages_par_maille s'il est déjà calculé.
+    """
+    if couches.obs is None:
+        raise ValueError("Les observations ne sont pas chargées")
+    if passages is None:
+        passages = passages_par_maille(couches, date_min, date_max, workers)
+
+    masque = fenetre_dates(couches.obs_date, date_min, date_max) & np.isin(
+        couches.obs_cd_nom, list(cd_nom_values)
+    )
+    points = couches.obs_geom_2154[masque]
+
+    arbre = STRtree(couches.grille_geom_2154)
+    idx_obs, idx_mailles = arbre.query(points, predicate="dwithin", distance=BUFFER_METRES)
+    nb_passages_max = np.zeros(len(points), dtype=np.int64)
+    np.maximum.at(nb_passages_max, idx_obs, passages[idx_mailles])
+
+    if geometrie == "buffer":
+        # Buffer de 50m en Lambert-93 (8 segments par quart de cercle, comme PostGIS)
+        geom = gpd.GeoSeries(shapely.buffer(points, BUFFER_METRES), crs=SRID_METRIQUE)
+        geom = geom.to_crs(4326).to_numpy()
+    else:
+        geom = couches.obs.geometry.to_numpy()[masque]
+
+    return gpd.GeoDataFrame(
+        {
+            "id": couches.obs_id[masque],
+            "cd_nom": couches.obs_cd_nom[masque],
+            "zone_sensible": nb_passages_max > seuil,
+            "nb_passages_max": nb_passages_max,
+        },
+        geometry=geom,
+        crs=4326,
+    )
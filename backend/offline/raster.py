@@ -0,0 +1,159 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import numpy as np
+import shapely
+
+from backend.offline import moteur
+from backend.utils.raster import (
+    FICHIER_CUBE,
+    FICHIER_MAILLES,
+    FICHIER_META,
+    TAILLE_MAILLE,
+)
+
+MAX_UINT16 = np.iinfo(np.uint16).max
+NODATA = -1
+
+
+def positions_mailles(grille_geom_2154, taille=TAILLE_MAILLE):
+    """
+    Origine (coin nord-ouest) et (lignes, colonnes) des mailles dans le raster
+    Lambert-93, à partir de leurs centres. Échoue si la grille n'est pas régulière.
+    """
+    centres = shapely.centroid(grille_geom_2154)
+    x, y = shapely.get_x(centres), shapely.get_y(centres)
+    x0, y0 = x.min() - taille / 2, y.max() + taille / 2
+    colonnes = np.rint((x - x0) / taille - 0.5).astype(np.int64)
+    lignes = np.rint((y0 - y) / taille - 0.5).astype(np.int64)
+    if len(np.unique(lignes * (colonnes.max() + 1) + colonnes)) != len(centres):
+        raise click.ClickException(f"La grille n'est pas une grille régulière de {taille}m")
+    return (float(x0), float(y0)), lignes, colonnes
+
+
+def _compter_jours(traces_geom, jours, nb_jours, nb_mailles):
+    # Paires (trace, maille) qui s'intersectent, comptées par jour et par maille
+    idx_traces, idx_mailles = moteur._arbre_grille.query(traces_geom, predicate="intersects")
+    comptes = np.bincount(
+        jours[idx_traces] * nb_mailles + idx_mailles, minlength=nb_jours * nb_mailles
+    )
+    return comptes.reshape(nb_jours, nb_mailles)
+
+
+def construire_cube(
+    couches, dossier, etat, etat_grille, workers=None, jours_par_lot=moteur.JOURS_PAR_LOT
+):
+    """
+    Calcule le cube jours × mailles des passages (uint16, .npy mappé en mémoire)
+    dans dossier. etat : (trace_count, trace_max_id) des traces chargées et
+    etat_grille : (nombre, id maximal) des mailles, pour que l'API sache si le
+    cube est à jour. Les lots de jours sont répartis
+    entre workers processus (workers=1 : calcul dans le processus courant).
+    """
+    valides = ~np.isnat(couches.traces_date)
+    geoms, dates = couches.traces_geom[valides], couches.traces_date[valides]
+    if not len(geoms):
+        raise click.ClickException("Aucune trace datée à rasteriser")
+    date_debut = dates.min()
+    nb_jours = int((dates.max() - date_debut).astype(int)) + 1
+    nb_mailles = len(couches.grille_geom)
+    origine, lignes, colonnes = positions_mailles(couches.grille_geom_2154)
+
+    jours = (dates - date_debut).astype(np.int64)
+    numeros = jours // jours_par_lot
+    lots = []
+    for numero in np.unique(numeros):
+        masque = numeros == numero
+        debut = int(numero) * jours_par_lot
+        lots.append(
+            (debut, geoms[masque], jours[masque] - debut, min(jours_par_lot, nb_jours - debut))
+        )
+
+    os.makedirs(dossier, exist_ok=True)
+    # Fichiers écrits sous un nom temporaire puis renommés : les processus de
+    # l'API gardent l'ancien cube mappé jusqu'à la mise à jour de cube.json
+    cube = np.lib.format.open_memmap(
+        os.path.join(dossier, FICHIER_CUBE + ".tmp"),
+        mode="w+",
+        dtype=np.uint16,
+        shape=(nb_jours, nb_mailles),
+    )
+    arguments = (
+        [lot[1] for lot in lots],
+        [lot[2] for lot in lots],
+        [lot[3] for lot in lots],
+        [nb_mailles] * len(lots),
+    )
+    if workers == 1 or len(lots) == 1:
+        moteur._init_processus(couches.grille_geom)
+        resultats = map(_compter_jours, *arguments)
+        _ecrire_lots(cube, lots, resultats)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=moteur._init_processus,
+            initargs=(couches.grille_geom,),
+        ) as pool:
+            _ecrire_lots(cube, lots, pool.map(_compter_jours, *arguments))
+    cube.flush()
+    del cube
+
+    mailles = np.zeros(nb_mailles, dtype=[("id", "i8"), ("ligne", "i8"), ("colonne", "i8")])
+    mailles["id"], mailles["ligne"], mailles["colonne"] = couches.grille_id, lignes, colonnes
+    with open(os.path.join(dossier, FICHIER_MAILLES + ".tmp"), "wb") as fichier:
+        np.save(fichier, mailles)
+
+    meta = {
+        "date_debut": str(date_debut.astype("datetime64[D]")),
+        "nb_jours": nb_jours,
+        "lignes": int(lignes.max()) + 1,
+        "colonnes": int(colonnes.max()) + 1,
+        "taille": TAILLE_MAILLE,
+        "origine": origine,
+        "srid": 2154,
+        "trace_count": etat[0],
+        "trace_max_id": etat[1],
+        "grille_count": etat_grille[0],
+        "grille_max_id": etat_grille[1],
+    }
+    with open(os.path.join(dossier, FICHIER_META + ".tmp"), "w", encoding="utf-8") as fichier:
+        json.dump(meta, fichier, indent=2)
+    for nom in (FICHIER_CUBE, FICHIER_MAILLES, FICHIER_META):
+        os.replace(os.path.join(dossier, nom + ".tmp"), os.path.join(dossier, nom))
+    return meta
+
+
+def _ecrire_lots(cube, lots, resultats):
+    for (debut, _, _, nb_jours), comptes in zip(lots, resultats):
+        if comptes.max(initial=0) > MAX_UINT16:
+            raise click.ClickException("Plus de 65535 passages par jour dans une maille")
+        cube[debut : debut + nb_jours] = comptes
+
+
+def ecrire_geotiff(cube, date_min, date_max, chemin):
+    """
+    GeoTIFF Lambert-93 des passages par maille sur la période (int32, -1 hors
+    grille), pour QGIS. Nécessite rasterio.
+    """
+    import rasterio
+    from rasterio.transform import from_origin
+
+    raster = cube.grille(cube.passages(date_min, date_max).astype(np.int32), vide=NODATA)
+    x0, y0 = cube.meta["origine"]
+    with rasterio.open(
+        chemin,
+        "w",
+        driver="GTiff",
+        height=raster.shape[0],
+        width=raster.shape[1],
+        count=1,
+        dtype="int32",
+        crs="EPSG:2154",
+        transform=from_origin(x0, y0, cube.meta["taille"], cube.meta["taille"]),
+        nodata=NODATA,
+        compress="deflate",
+    ) as destination:
+        destination.write(raster, 1)
+        destination.update_tags(date_min=date_min.isoformat(), date_max=date_max.isoformat())
@@ -0,0 +1,176 @@
+from datetime import timedelta
+
+from flask import Blueprint, jsonify, request
+
+from backend.models.ecocompteur import EcoCompteurRollup, EcoCompteurSite
+from backend.utils.cache import en_cache
+from backend.utils.env import db
+from backend.utils.params import (
+    ParametreInvalide,
+    parse_choix,
+    parse_dates,
+    reponse_parametre_invalide,
+)
+from sqlalchemy import BigInteger, Date, cast, func, or_, select, union_all
+
+ecocompteur = Blueprint("ecocompteur", __name__, url_prefix="/api/ecocompteur")
+ecocompteur.register_error_handler(ParametreInvalide, reponse_parametre_invalide)
+
+RESOLUTIONS = ("day", "week", "month", "year")
+# Même résolution par défaut pour la série d'un site et la comparaison
+RESOLUTION_DEFAUT = "month"
+
+
+def _debut_periode(day, resolution):
+    # Premier jour de la période contenant day (même découpage que date_trunc)
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    if resolution == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _periode_suivante(debut, resolution):
+    # Premier jour de la période qui suit celle commençant à debut
+    if resolution == "week":
+        return debut + timedelta(days=7)
+    if resolution == "month":
+        return (debut + timedelta(days=32)).replace(day=1)
+    if resolution == "year":
+        return debut.replace(year=debut.year + 1)
+    return debut + timedelta(days=1)
+
+
+def _series_query(resolution, date_min, date_max, site_id=None):
+    """
+    (site_id, periode, valeur) par site et par période. Entre date-min et
+    date-max, les périodes entièrement comprises sont lues dans le rollup de
+    la résolution ; les périodes coupées par les bornes sont recalculées depuis
+    le rollup journalier, sur les seuls jours de l'intervalle (une période
+    partielle garde son premier jour comme date).
+    """
+    rollup = EcoCompteurRollup
+    query = select(rollup.site_id, rollup.periode, rollup.valeur).where(
+        rollup.resolution == resolution
+    )
+    if site_id is not None:
+        query = query.where(rollup.site_id == site_id)
+    if date_min is None:
+        return query.order_by(rollup.site_id, rollup.periode)
+
+    # [debut, fin[ : périodes complètes de l'intervalle
+    debut = _debut_periode(date_min, resolution)
+    if debut < date_min:
+        debut = _periode_suivante(debut, resolution)
+    fin = _debut_periode(date_max + timedelta(days=1), resolution)
+    query = query.where(rollup.periode >= debut, rollup.periode < fin)
+    if resolution == "day":
+        return query.order_by(rollup.site_id, rollup.periode)
+
+    periode = cast(func.date_trunc(resolution, rollup.periode), Date)
+    # sum(bigint) est un numeric : ramené en bigint, comme la colonne valeur
+    valeur = cast(func.sum(rollup.valeur), BigInteger)
+    bords = (
+        select(rollup.site_id, periode.label("periode"), valeur.label("valeur"))
+        .where(
+            rollup.resolution == "day",
+            rollup.periode >= date_min,
+            rollup.periode <= date_max,
+            or_(rollup.periode < debut, rollup.periode >= fin),
+        )
+        .group_by(rollup.site_id, periode)
+    )
+    if site_id is not None:
+        bords = bords.where(rollup.site_id == site_id)
+    series = union_all(query, bords).subquery()
+    return select(series.c.site_id, series.c.periode, series.c.valeur).order_by(
+        series.c.site_id, series.c.periode
+    )
+
+
+def _site_dict(site):
+    return {
+        "id": site.id,
+        "nom": site.nom,
+        "lon": site.lon,
+        "lat": site.lat,
+    }
+
+
+def _sites_query():
+    return select(
+        EcoCompteurSite.id,
+        EcoCompteurSite.nom,
+        func.ST_X(EcoCompteurSite.geom).label("lon"),
+        func.ST_Y(EcoCompteurSite.geom).label("lat"),
+    ).order_by(EcoCompteurSite.id)
+
+
+@ecocompteur.route("/sites", methods=["GET"])
+@en_cache
+def list_sites():
+    sites = db.session.execute(_sites_query()).all()
+    return jsonify(sites=[_site_dict(site) for site in sites])
+
+
+@ecocompteur.route("/<int:site_id>", methods=["GET"])
+@en_cache
+def site_series(site_id):
+    """
+    Série des visites d'un site, agrégée par jour, semaine, mois ou année
+    (?resolution=day|week|month|year, month par défaut), optionnellement entre
+    date-min et date-max : seuls les jours de l'intervalle sont comptés, y
+    compris dans les périodes qu'il coupe.
+    """
+    resolution = parse_choix(request.args, "resolution", RESOLUTIONS, RESOLUTION_DEFAUT)
+    date_min, date_max = parse_dates(request.args, requis=False)
+
+    site = db.session.execute(
+        _sites_query().where(EcoCompteurSite.id == site_id)
+    ).one_or_none()
+    if site is None:
+        return (
+            jsonify(
+                {
+                    "error": "Site inconnu",
+                    "detail": f"Aucun éco-compteur avec l'id {site_id}",
+                }
+            ),
+            404,
+        )
+
+    rows = db.session.execute(
+        _series_query(resolution, date_min, date_max, site_id=site_id)
+    ).all()
+
+    return jsonify(
+        site=_site_dict(site),
+        resolution=resolution,
+        series=[
+            {"periode": row.periode.isoformat(), "valeur": row.valeur} for row in rows
+        ],
+    )
+
+
+@ecocompteur.route("/comparaison", methods=["GET"])
+@en_cache
+def comparaison():
+    """
+    Séries de tous les sites dans une seule réponse, pour les comparer
+    (mêmes paramètres resolution, date-min, date-max que la série d'un site).
+    """
+    resolution = parse_choix(request.args, "resolution", RESOLUTIONS, RESOLUTION_DEFAUT)
+    date_min, date_max = parse_dates(request.args, requis=False)
+
+    sites = {
+        site.id: {**_site_dict(site), "series": []}
+        for site in db.session.execute(_sites_query()).all()
+    }
+    for row in db.session.execute(_series_query(resolution, date_min, date_max)):
+        sites[row.site_id]["series"].append(
+            {"periode": row.periode.isoformat(), "valeur": row.valeur}
+        )
+
+    return jsonify(resolution=resolution, sites=list(sites.values()))
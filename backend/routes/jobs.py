@@ -0,0 +1,123 @@
+import os
+
+from flask import Blueprint, current_app, jsonify, request, send_file, url_for
+from werkzeug.datastructures import MultiDict
+
+from backend.models.job import Job
+from backend.utils.env import db
+from backend.utils.formats import MIMETYPES
+from backend.utils.jobs import TYPES_JOBS, reveiller, soumettre
+from backend.utils.params import ParametreInvalide, reponse_parametre_invalide
+
+jobs = Blueprint("jobs", __name__, url_prefix="/api/jobs")
+jobs.register_error_handler(ParametreInvalide, reponse_parametre_invalide)
+
+# Intervalle de scrutation conseillé aux clients (secondes)
+RETRY_AFTER = 2
+
+
+def _parametres_requete():
+    # Paramètres en query string ou en corps JSON ({"cd_nom": [1, 2], ...})
+    corps = request.get_json(silent=True)
+    if not isinstance(corps, dict):
+        return request.values
+    return MultiDict(
+        [
+            (nom, str(valeur))
+            for nom, valeurs in corps.items()
+            for valeur in (valeurs if isinstance(valeurs, list) else [valeurs])
+        ]
+    )
+
+
+def _job_dict(job):
+    return {
+        "id": str(job.id),
+        "type": job.type,
+        "statut": job.statut,
+        "tentatives": job.tentatives,
+        "parametres": job.parametres,
+        "erreur": job.erreur,
+        "cree_le": job.cree_le.isoformat() if job.cree_le else None,
+        "demarre_le": job.demarre_le.isoformat() if job.demarre_le else None,
+        "termine_le": job.termine_le.isoformat() if job.termine_le else None,
+        "url": url_for("jobs.resultat_job", job_id=job.id),
+    }
+
+
+@jobs.route("/<type_job>", methods=["POST"])
+def creer_job(type_job):
+    """
+    Lance un traitement en arrière-plan (zones-sensibles : mêmes paramètres que
+    /api/zones-sensibles/batch) et renvoie son id. Une demande identique à un
+    job en cours ou terminé renvoie ce job.
+    """
+    if type_job not in TYPES_JOBS:
+        return (
+            jsonify(
+                {
+                    "error": "Type de job inconnu",
+                    "detail": f"'{type_job}' n'est pas un type de job ({', '.join(TYPES_JOBS)})",
+                }
+            ),
+            404,
+        )
+    if not current_app.config["JOBS_DIR"]:
+        return (
+            jsonify(
+                {
+                    "error": "Jobs indisponibles",
+                    "detail": "JOBS_DIR (ARDECHE_JOBS_DIR) doit désigner un dossier partagé par l'API et les workers",
+                }
+            ),
+            501,
+        )
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as err:
+        return (
+            jsonify(
+                {
+                    "error": "Format indisponible",
+                    "detail": f"Les résultats GeoParquet nécessitent le module {err.name}",
+                }
+            ),
+            501,
+        )
+
+    parametres = TYPES_JOBS[type_job][0](_parametres_requete())
+    job = soumettre(type_job, parametres)
+    if job.statut == "en_attente":
+        reveiller(current_app._get_current_object())
+    response = jsonify(_job_dict(job))
+    response.status_code = 202
+    response.headers["Location"] = url_for("jobs.resultat_job", job_id=job.id)
+    return response
+
+
+@jobs.route("/<uuid:job_id>", methods=["GET"])
+def resultat_job(job_id):
+    """
+    Statut du job (202 tant qu'il n'est pas terminé), puis son résultat en
+    GeoParquet (200).
+    """
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({"error": "Job inconnu", "detail": f"Aucun job {job_id}"}), 404
+    if job.statut == "erreur":
+        return jsonify({"error": "Échec du traitement", "detail": job.erreur}), 500
+    if job.statut != "termine":
+        response = jsonify(_job_dict(job))
+        response.status_code = 202
+        response.headers["Retry-After"] = str(RETRY_AFTER)
+        return response
+    if not os.path.exists(job.resultat):
+        return (
+            jsonify({"error": "Résultat supprimé", "detail": "Relancer le traitement"}),
+            410,
+        )
+    return send_file(
+        job.resultat,
+        mimetype=MIMETYPES["geoparquet"],
+        download_name=f"{job.type}-{job.id}.parquet",
+    )
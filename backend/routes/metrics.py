@@ -0,0 +1,39 @@
+import hmac
+import ipaddress
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from backend.utils.timing import registre
+
+metrics = Blueprint("metrics", __name__, url_prefix="/api")
+
+# En-têtes ajoutés par un proxy inverse : derrière lui, remote_addr est le proxy
+ENTETES_PROXY = ("X-Forwarded-For", "X-Real-IP", "Forwarded")
+
+
+def _acces_autorise() -> bool:
+    """
+    Avec METRICS_TOKEN (ARDECHE_METRICS_TOKEN), seul l'en-tête
+    Authorization: Bearer <jeton> donne accès. Sans jeton, seuls les appels
+    directs de l'hôte local sont acceptés : une requête relayée par un proxy
+    arrive elle aussi de 127.0.0.1, elle est refusée.
+    """
+    jeton = current_app.config.get("METRICS_TOKEN")
+    if jeton:
+        fourni = request.headers.get("Authorization", "")
+        return hmac.compare_digest(fourni.encode(), f"Bearer {jeton}".encode())
+    if any(entete in request.headers for entete in ENTETES_PROXY):
+        return False
+    return ipaddress.ip_address(request.remote_addr or "0.0.0.0").is_loopback
+
+
+@metrics.route("/_metrics", methods=["GET"])
+def prometheus():
+    """
+    Compteurs de temps (SQL, fetch, sérialisation), lignes et octets par route,
+    au format texte Prometheus. Réservé au détenteur de METRICS_TOKEN, ou aux
+    appels locaux directs si aucun jeton n'est configuré.
+    """
+    if not _acces_autorise():
+        return jsonify({"error": "Accès refusé", "detail": "Métriques réservées au jeton METRICS_TOKEN ou à l'hôte local"}), 403
+    return Response(registre.prometheus(), mimetype="text/plain; version=0.0.4")
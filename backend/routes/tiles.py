@@ -0,0 +1,110 @@
+from flask import Blueprint, Response, jsonify, request
+
+from backend.utils.cache import en_cache
+from backend.utils.connexions import lecture_seule
+from backend.utils.env import db
+from backend.utils.params import (
+    ParametreInvalide,
+    parse_cd_nom,
+    parse_cd_nom_list,
+    parse_choix,
+    parse_dates,
+    parse_float,
+    parse_int,
+    reponse_parametre_invalide,
+)
+from backend.utils.queries import (
+    SEUIL_PASSAGES,
+    analyse_query,
+    obs_grid_query,
+    zones_sensibles_query,
+)
+from sqlalchemy import func, select
+
+tiles = Blueprint("tiles", __name__, url_prefix="/api/tiles")
+tiles.register_error_handler(ParametreInvalide, reponse_parametre_invalide)
+
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+
+
+def _couche_grid(args, emprise):
+    cell_size = parse_float(args, "cell_size", 0.01, positif=True)
+    cd_nom_values = parse_cd_nom_list(args)
+    date_min, date_max = parse_dates(args, requis=False)
+    return obs_grid_query(cell_size, cd_nom_values, date_min, date_max, emprise=emprise)
+
+
+def _couche_passages(args, emprise):
+    date_min, date_max = parse_dates(args)
+    return analyse_query(date_min, date_max, emprise=emprise)
+
+
+def _couche_zones_sensibles(args, emprise):
+    date_min, date_max = parse_dates(args)
+    cd_nom = parse_cd_nom(args)
+    geometrie = parse_choix(args, "geometry", ("buffer", "point"), "buffer")
+    seuil = parse_int(args, "seuil", SEUIL_PASSAGES)
+    return zones_sensibles_query(
+        [cd_nom], date_min, date_max, emprise=emprise, geometrie=geometrie, seuil=seuil
+    )
+
+
+# Couches disponibles : mêmes requêtes et mêmes filtres que les routes GeoJSON
+COUCHES = {
+    "grid": _couche_grid,
+    "passages": _couche_passages,
+    "zones-sensibles": _couche_zones_sensibles,
+}
+
+
+@tiles.route("/<layer>/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+@lecture_seule(timeout_ms=10_000)
+@en_cache
+def tile(layer, z, x, y):
+    """
+    Tuile vectorielle (Mapbox Vector Tile) d'une couche, limitée à l'emprise z/x/y.
+    Les géométries sont découpées et quantifiées par PostGIS (ST_AsMVTGeom).
+    """
+    if layer not in COUCHES:
+        return (
+            jsonify(
+                {
+                    "error": "Couche inconnue",
+                    "detail": f"'{layer}' n'est pas une couche ({', '.join(COUCHES)})",
+                }
+            ),
+            404,
+        )
+    if z < 0 or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return (
+            jsonify(
+                {
+                    "error": "Tuile invalide",
+                    "detail": f"{z}/{x}/{y} est hors de la grille des tuiles",
+                }
+            ),
+            404,
+        )
+
+    enveloppe = func.ST_TileEnvelope(z, x, y)
+    query = COUCHES[layer](request.args, func.ST_Transform(enveloppe, 4326)).subquery()
+
+    proprietes = [column for column in query.c if column.key != "geom"]
+    tile_rows = select(
+        func.ST_AsMVTGeom(
+            func.ST_Transform(query.c.geom, 3857), enveloppe, MVT_EXTENT, MVT_BUFFER, True
+        ).label("geom"),
+        *proprietes,
+    ).subquery("tile")
+
+    mvt = db.session.execute(
+        select(func.ST_AsMVT(tile_rows.table_valued(), layer, MVT_EXTENT, "geom"))
+        .select_from(tile_rows)
+        .where(tile_rows.c.geom.isnot(None))
+    ).scalar()
+
+    return Response(
+        bytes(mvt) if mvt is not None else b"",
+        mimetype="application/vnd.mapbox-vector-tile",
+    )
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from backend.utils.env import db
+
+# Paramètres à valeurs multiples (ordre sans importance) et paramètres numériques.
+# Les routes à une seule espèce refusent les cd_nom répétés (params.parse_cd_nom) :
+# seules les listes, où l'ordre est indifférent, sont servies depuis le cache
+PARAMETRES_LISTES = {"cd_nom"}
+PARAMETRES_NOMBRES = {"cell_size"}
+# En-têtes de la réponse conservés avec le corps (pagination des formats binaires)
+ENTETES_CACHES = ("X-Next-Cursor",)
+
+
+class CacheDisque:
+    """
+    Cache de réponses sur disque (SQLite), partagé entre les workers d'une même
+    machine et borné en taille : les entrées les moins récemment lues sont
+    supprimées au-delà de taille_max octets.
+    """
+
+    def __init__(self, chemin: str, taille_max: int, taille_max_entree: int):
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        self.chemin = chemin
+        self.taille_max = taille_max
+        self.taille_max_entree = taille_max_entree
+        self._local = threading.local()
+        with self._connexion() as connexion:
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS entree ("
+                " cle TEXT PRIMARY KEY, mimetype TEXT, corps BLOB,"
+                " taille INTEGER, acces REAL, entetes TEXT)"
+            )
+            colonnes = {row[1] for row in connexion.execute("PRAGMA table_info(entree)")}
+            if "entetes" not in colonnes:
+                # Cache créé avant la colonne entetes : ses entrées n'ont pas
+                # d'en-têtes enregistrés, elles sont supprimées
+                connexion.execute("DELETE FROM entree")
+                connexion.execute("ALTER TABLE entree ADD COLUMN entetes TEXT")
+            connexion.execute("CREATE INDEX IF NOT EXISTS idx_entree_acces ON entree (acces)")
+
+    def _connexion(self):
+        # Une connexion par thread, journal WAL pour les accès concurrents
+        if getattr(self._local, "connexion", None) is None:
+            connexion = sqlite3.connect(self.chemin, timeout=10, isolation_level=None)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.connexion = connexion
+        return self._local.connexion
+
+    def get(self, cle: str):
+        connexion = self._connexion()
+        row = connexion.execute(
+            "SELECT mimetype, corps, entetes FROM entree WHERE cle = ?", (cle,)
+        ).fetchone()
+        if row is None:
+            return None
+        connexion.execute("UPDATE entree SET acces = ? WHERE cle = ?", (time.time(), cle))
+        mimetype, corps, entetes = row
+        return mimetype, corps, json.loads(entetes or "{}")
+
+    def set(self, cle: str, mimetype: str, corps: bytes, entetes=None):
+        if len(corps) > self.taille_max_entree:
+            return
+        connexion = self._connexion()
+        connexion.execute(
+            "INSERT OR REPLACE INTO entree (cle, mimetype, corps, taille, acces, entetes)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (cle, mimetype, corps, len(corps), time.time(), json.dumps(entetes or {})),
+        )
+        self._evincer(connexion)
+
+    def _evincer(self, connexion):
+        # Éviction LRU jusqu'à repasser sous la taille maximale
+        total = connexion.execute("SELECT coalesce(sum(taille), 0) FROM entree").fetchone()[0]
+        while total > self.taille_max:
+            rows = connexion.execute(
+                "SELECT cle, taille FROM entree ORDER BY acces LIMIT 16"
+            ).fetchall()
+            if not rows:
+                break
+            connexion.executemany("DELETE FROM entree WHERE cle = ?", [(cle,) for cle, _ in rows])
+            total -= sum(taille for _, taille in rows)
+
+    def vider(self):
+        self._connexion().execute("DELETE FROM entree")
+
+
+_version_memo = {"valeur": None, "expire": 0.0}
+
+
+def version_donnees():
+    """
+    (version, updated_at) de ardeche.data_version, relue au plus toutes les
+    CACHE_VERSION_TTL secondes. None si la table n'existe pas.
+    """
+    maintenant = time.monotonic()
+    if maintenant < _version_memo["expire"]:
+        return _version_memo["valeur"]
+    try:
+        valeur = db.session.execute(
+            text("SELECT version, updated_at FROM ardeche.data_version")
+        ).one_or_none()
+    except ProgrammingError:
+        # Migration create_data_version.sql pas encore appliquée
+        db.session.rollback()
+        valeur = None
+    _version_memo["valeur"] = tuple(valeur) if valeur is not None else None
+    _version_memo["expire"] = maintenant + current_app.config["CACHE_VERSION_TTL"]
+    return _version_memo["valeur"]
+
+
+def _normaliser(nom, valeurs):
+    if nom in PARAMETRES_LISTES:
+        valeurs = sorted(
+            {part for valeur in valeurs for part in valeur.split(",") if part},
+            key=lambda part: (len(part), part),
+        )
+    elif nom in PARAMETRES_NOMBRES:
+        try:
+            valeurs = [repr(float(valeur)) for valeur in valeurs]
+        except ValueError:
+            pass
+    elif nom == "format":
+        valeurs = [valeur.lower() for valeur in valeurs]
+    return f"{nom}={','.join(valeurs)}"
+
+
+def cle_requete(version) -> str:
+    # Chemin + paramètres triés et normalisés + version des données
+    parametres = "&".join(
+        _normaliser(nom, request.args.getlist(nom)) for nom in sorted(request.args)
+    )
+    return f"{request.path}?{parametres}#v{version}"
+
+
+def _entetes_caches(response):
+    return {nom: response.headers[nom] for nom in ENTETES_CACHES if nom in response.headers}
+
+
+def _enregistrer_flux(cache, cle, mimetype, entetes, morceaux):
+    # Transmet le flux au client et l'enregistre s'il va jusqu'au bout
+    corps = []
+    taille = 0
+    for morceau in morceaux:
+        if isinstance(morceau, str):
+            morceau = morceau.encode()
+        if taille <= cache.taille_max_entree:
+            corps.append(morceau)
+            taille += len(morceau)
+        yield morceau
+    if taille <= cache.taille_max_entree:
+        cache.set(cle, mimetype, b"".join(corps), entetes)
+
+
+def en_cache(view):
+    """
+    Met en cache les réponses 200 de la route, par paramètres normalisés et
+    version des données, et les sert avec ETag / Last-Modified (réponses 304).
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get("cache_reponses")
+        version = version_donnees() if cache is not None else None
+        if version is None:
+            return view(*args, **kwargs)
+
+        numero, modifie = version
+        cle = cle_requete(numero)
+        etag = hashlib.sha1(cle.encode()).hexdigest()
+        modifie = modifie.replace(microsecond=0)
+
+        def entetes(response):
+            response.set_etag(etag)
+            response.last_modified = modifie
+            # Les clients et proxys doivent revalider (ETag) à chaque utilisation
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        if request.if_none_match.contains(etag) or (
+            not request.if_none_match
+            and request.if_modified_since is not None
+            and modifie <= request.if_modified_since
+        ):
+            return entetes(Response(status=304))
+
+        entree = cache.get(cle)
+        if entree is not None:
+            mimetype, corps, entetes_caches = entree
+            response = entetes(Response(corps, mimetype=mimetype, headers=entetes_caches))
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        if response.is_streamed:
+            response.response = _enregistrer_flux(
+                cache, cle, response.mimetype, _entetes_caches(response), response.response
+            )
+        else:
+            cache.set(cle, response.mimetype, response.get_data(), _entetes_caches(response))
+        response = entetes(response)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
+
+
+def init_cache(app):
+    app.config.setdefault(
+        "CACHE_DIR", os.path.join(tempfile.gettempdir(), "ardeche-api-cache")
+    )
+    app.config.setdefault("CACHE_MAX_BYTES", 512 * 1024 * 1024)
+    app.config.setdefault("CACHE_MAX_ENTRY_BYTES", 64 * 1024 * 1024)
+    app.config.setdefault("CACHE_VERSION_TTL", 5)
+    if not app.config["CACHE_DIR"]:
+        return
+    app.extensions["cache_reponses"] = CacheDisque(
+        os.path.join(app.config["CACHE_DIR"], "reponses.sqlite"),
+        app.config["CACHE_MAX_BYTES"],
+        app.config["CACHE_MAX_ENTRY_BYTES"],
+    )
@@ -0,0 +1,74 @@
+import logging
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend.utils.env import db
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE query_canceled (statement_timeout atteint)
+PGCODE_ANNULATION = "57014"
+
+
+def lecture_seule(timeout_ms=None):
+    """
+    Route d'analyse : ses lectures partent vers la réplique si elle est
+    configurée, et ses requêtes sont interrompues au-delà de timeout_ms
+    (surchargé par STATEMENT_TIMEOUTS[endpoint]). À placer juste sous
+    @route, avant @en_cache, pour que la version des données soit lue sur la
+    même base que les données.
+    """
+
+    def decorateur(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.lecture_seule = True
+            delai = current_app.config["STATEMENT_TIMEOUTS"].get(request.endpoint, timeout_ms)
+            if delai:
+                # SET LOCAL : limité à la transaction de la requête, y compris
+                # la lecture en flux du curseur serveur
+                db.session.execute(
+                    text("SELECT set_config('statement_timeout', :delai, true)"),
+                    {"delai": str(int(delai))},
+                )
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorateur
+
+
+def delai_depasse(err) -> bool:
+    # statement_timeout atteint : pgcode pour psycopg2 comme pour asyncpg
+    # (qui le lève en DBAPIError générique), sqlstate pour asyncpg brut
+    orig = getattr(err, "orig", None)
+    return PGCODE_ANNULATION in (getattr(orig, "pgcode", None), getattr(orig, "sqlstate", None))
+
+
+def erreur_base(err):
+    """
+    (corps JSON, statut) d'une erreur de connexion ou d'un délai dépassé.
+    err : erreur SQLAlchemy (OperationalError, DBAPIError) ou ConnectionError
+    levée par asyncpg quand le serveur refuse la connexion.
+    """
+    if delai_depasse(err):
+        return {
+            "error": "Délai dépassé",
+            "detail": "La requête a dépassé le temps maximal autorisé, réduire la période ou l'emprise",
+        }, 504
+    # Le message du pilote peut contenir l'hôte, le port et le rôle : journalisé
+    # côté serveur seulement
+    logger.error("Base indisponible : %s", getattr(err, "orig", err))
+    return {
+        "error": "Base indisponible",
+        "detail": "La base de données ne répond pas, réessayer plus tard",
+    }, 503
+
+
+def reponse_erreur_base(err: OperationalError):
+    db.session.rollback()
+    corps, statut = erreur_base(err)
+    return jsonify(corps), statut
@@ -1,3 +1,29 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-db = SQLAlchemy()
+# Clé de la base en lecture seule (SQLALCHEMY_BINDS), si une réplique est configurée
+BIND_LECTURE = "lecture"
+
+
+class SessionRoutee(Session):
+    """
+    Session qui envoie les lectures des routes marquées @lecture_seule vers la
+    réplique ; les écritures (flush, INSERT/UPDATE/DELETE) restent sur la base
+    principale.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and has_app_context()
+            and g.get("lecture_seule")
+            and BIND_LECTURE in self._db.engines
+            and not self._flushing
+            and not getattr(clause, "is_dml", False)
+        ):
+            return self._db.engines[BIND_LECTURE]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": SessionRoutee})
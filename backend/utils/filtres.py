@@ -0,0 +1,185 @@
+import base64
+import binascii
+import json
+import math
+
+from sqlalchemy import func, select, tuple_
+
+from backend.utils.params import ParametreInvalide, parse_int
+
+# Préfixe des colonnes techniques (clés de pagination), exclues des propriétés
+PREFIXE_CLE = "_cle"
+LIMITE_MAX = 100000
+ZOOM_MAX = 22
+
+
+def cle_id(subq):
+    # Clé de pagination des routes dont chaque feature a un id
+    return [subq.c.id]
+
+
+def cle_position(subq):
+    # Clé de pagination de /api/grid : position du centre de la maille
+    return [func.ST_X(subq.c.geom), func.ST_Y(subq.c.geom)]
+
+
+def tolerance_zoom(zoom: int) -> float:
+    # Taille d'un pixel de tuile 256px au niveau de zoom, en degrés
+    return 360 / (256 * 2**zoom)
+
+
+def encoder_curseur(valeurs) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(valeurs)).encode()).decode().rstrip("=")
+
+
+def decoder_curseur(curseur: str, nb_cles: int):
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)))
+    except (binascii.Error, ValueError):
+        valeurs = None
+    if not isinstance(valeurs, list) or len(valeurs) != nb_cles:
+        raise ParametreInvalide(
+            "Paramètre cursor invalide", "Le curseur ne provient pas de cette route"
+        )
+    return valeurs
+
+
+def parse_bbox(args):
+    # bbox=xmin,ymin,xmax,ymax en WGS84
+    value = args.get("bbox")
+    if value is None:
+        return None
+    try:
+        bbox = [float(part) for part in value.split(",")]
+    except ValueError:
+        bbox = []
+    if len(bbox) != 4 or not (bbox[0] < bbox[2] and bbox[1] < bbox[3]):
+        raise ParametreInvalide(
+            "Paramètre bbox invalide",
+            f"'{value}' n'est pas une emprise xmin,ymin,xmax,ymax",
+        )
+    return bbox
+
+
+def _parse_borne(args, name, minimum, maximum):
+    value = parse_int(args, name, None)
+    if value is not None and not minimum <= value <= maximum:
+        raise ParametreInvalide(
+            f"Paramètre {name} invalide",
+            f"'{value}' n'est pas un entier entre {minimum} et {maximum}",
+        )
+    return value
+
+
+class Page:
+    """
+    Pagination par clé : lit limit + 1 lignes pour savoir s'il reste une page,
+    et calcule le curseur de la suivante à partir de la dernière ligne envoyée.
+    """
+
+    def __init__(self, limit: int, nb_cles: int):
+        self.limit = limit
+        self.nb_cles = nb_cles
+        self.curseur = None
+        self._envoyees = 0
+        self._derniere = None
+
+    def _curseur(self, row):
+        return encoder_curseur(row._mapping[f"{PREFIXE_CLE}{i}"] for i in range(self.nb_cles))
+
+    def tronquer(self, rows):
+        if len(rows) > self.limit:
+            rows = rows[: self.limit]
+            self.curseur = self._curseur(rows[-1])
+        return rows
+
+    def _lot(self, rows):
+        # (lignes à envoyer, limite atteinte) pour le lot suivant du curseur
+        fin = self._envoyees + len(rows) > self.limit
+        if fin:
+            rows = rows[: self.limit - self._envoyees]
+        if rows:
+            self._derniere = rows[-1]
+        self._envoyees += len(rows)
+        if fin:
+            self.curseur = self._curseur(self._derniere)
+        return rows, fin
+
+    def lots(self, partitions):
+        # Lots de lignes d'un curseur serveur, arrêtés à limit lignes
+        for rows in partitions:
+            rows, fin = self._lot(rows)
+            if rows:
+                yield rows
+            if fin:
+                return
+
+    async def lots_async(self, partitions):
+        # Variante de lots pour un curseur asynchrone (backend/asgi.py)
+        async for rows in partitions:
+            rows, fin = self._lot(rows)
+            if rows:
+                yield rows
+            if fin:
+                return
+
+
+class FiltresSpatiaux:
+    """
+    Paramètres communs aux routes spatiales :
+    bbox (emprise WGS84, transmise aux requêtes pour profiter des index GiST),
+    min_count (seuil sur le compte de la route), zoom (simplification et
+    précision adaptées à la taille d'un pixel), limit et cursor (pagination).
+    """
+
+    def __init__(self, args):
+        self.bbox = parse_bbox(args)
+        self.zoom = _parse_borne(args, "zoom", 0, ZOOM_MAX)
+        self.min_count = parse_int(args, "min_count", None)
+        self.limit = _parse_borne(args, "limit", 1, LIMITE_MAX)
+        self.cursor = args.get("cursor")
+        self.page = None
+
+    @property
+    def emprise(self):
+        if self.bbox is None:
+            return None
+        return func.ST_MakeEnvelope(*self.bbox, 4326)
+
+    @property
+    def precision(self):
+        # Décimales utiles au niveau de zoom (un dixième de pixel)
+        if self.zoom is None:
+            return None
+        return min(15, max(0, math.ceil(-math.log10(tolerance_zoom(self.zoom))) + 1))
+
+    def appliquer(self, query, compte, cle=cle_id):
+        """
+        Requête (geom, propriétés...) filtrée par min_count sur la colonne compte,
+        simplifiée selon le zoom, et paginée si limit est donné : les colonnes
+        de clé sont ajoutées sous les noms _cle0, _cle1...
+        """
+        subq = query.subquery()
+        geom = subq.c.geom
+        if self.zoom is not None:
+            geom = func.ST_SimplifyPreserveTopology(geom, tolerance_zoom(self.zoom))
+        cles = cle(subq)
+        colonnes_cles = []
+        if self.limit is not None:
+            colonnes_cles = [
+                expression.label(f"{PREFIXE_CLE}{i}") for i, expression in enumerate(cles)
+            ]
+        stmt = select(
+            geom.label("geom"),
+            *[column for column in subq.c if column.key != "geom"],
+            *colonnes_cles,
+        )
+        if self.min_count is not None:
+            stmt = stmt.where(subq.c[compte] >= self.min_count)
+        if self.cursor is not None:
+            valeurs = decoder_curseur(self.cursor, len(cles))
+            stmt = stmt.where(tuple_(*cles) > tuple_(*valeurs))
+        if self.limit is not None:
+            stmt = stmt.order_by(*cles).limit(self.limit + 1)
+            self.page = Page(self.limit, len(cles))
+        return stmt
@@ -0,0 +1,194 @@
+import io
+import json
+import os
+import tempfile
+
+from flask import Response, jsonify
+from sqlalchemy import func, select
+
+from backend.utils.env import db
+from backend.utils.filtres import cle_id
+from backend.utils.geojson import colonnes_requete, reponse_geojson
+from backend.utils.params import ParametreInvalide
+from backend.utils.timing import compter_lignes, mesure
+
+# Formats de sortie des routes spatiales (?format=)
+MIMETYPES = {
+    "geojson": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "flatgeobuf": "application/flatgeobuf",
+    "geoparquet": "application/vnd.apache.parquet",
+}
+CRS = "EPSG:4326"
+
+
+def parse_format(args) -> str:
+    format = args.get("format", "geojson").lower()
+    if format not in MIMETYPES:
+        raise ParametreInvalide(
+            "Paramètre format invalide",
+            f"'{format}' n'est pas un format ({', '.join(MIMETYPES)})",
+        )
+    return format
+
+
+def parse_precision(args):
+    # Nombre de décimales des coordonnées (None : pleine précision)
+    value = args.get("precision")
+    if value is None:
+        return None
+    try:
+        precision = int(value)
+    except ValueError:
+        precision = -1
+    if not 0 <= precision <= 15:
+        raise ParametreInvalide(
+            "Paramètre precision invalide",
+            f"'{value}' n'est pas un nombre de décimales entre 0 et 15",
+        )
+    return precision
+
+
+def arrow_select(query, precision=None):
+    """
+    Select (geom_wkb, propriétés..., clés) de la requête, ordonné par les clés
+    de pagination, et colonnes des propriétés.
+    """
+    subq = query.subquery()
+    proprietes, cles = colonnes_requete(subq)
+    geom = subq.c.geom
+    if precision is not None:
+        geom = func.ST_ReducePrecision(geom, 10**-precision)
+    stmt = select(func.ST_AsBinary(geom).label("geom_wkb"), *proprietes, *cles).order_by(*cles)
+    return stmt, proprietes
+
+
+def construire_table(rows, proprietes):
+    # Propriétés en colonnes et géométrie WKB (extension geoarrow.wkb)
+    import pyarrow as pa
+
+    colonnes = [pa.array([row._mapping[column.key] for row in rows]) for column in proprietes]
+    champs = [pa.field(column.key, colonne.type) for column, colonne in zip(proprietes, colonnes)]
+    champs.append(
+        pa.field(
+            "geometry",
+            pa.binary(),
+            metadata={
+                "ARROW:extension:name": "geoarrow.wkb",
+                "ARROW:extension:metadata": json.dumps({"crs": CRS, "crs_type": "authority_code"}),
+            },
+        )
+    )
+    colonnes.append(
+        pa.array(
+            [bytes(row.geom_wkb) if row.geom_wkb is not None else None for row in rows],
+            type=pa.binary(),
+        )
+    )
+    return pa.Table.from_arrays(colonnes, schema=pa.schema(champs))
+
+
+def table_arrow(query, precision=None, page=None):
+    """
+    Table Arrow des lignes de la requête : propriétés en colonnes et géométrie
+    en WKB (extension geoarrow.wkb) dans la colonne "geometry".
+    page : pagination (filtres.Page), la ligne en trop est retirée.
+    """
+    # ImportError levée avant d'exécuter la requête
+    import pyarrow  # noqa: F401
+
+    stmt, proprietes = arrow_select(query, precision)
+    rows = db.session.execute(stmt).all()
+    compter_lignes(len(rows))
+    if page is not None:
+        rows = page.tronquer(rows)
+    return construire_table(rows, proprietes)
+
+
+def ecrire_arrow(table, sink):
+    import pyarrow as pa
+
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def ecrire_geoparquet(table, sink):
+    import pyarrow.parquet as pq
+
+    geo = {
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        # crs absent : OGC:CRS84, soit lon/lat WGS84 comme EPSG:4326
+        "columns": {"geometry": {"encoding": "WKB", "geometry_types": []}},
+    }
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"geo"] = json.dumps(geo).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), sink, compression="zstd")
+
+
+def ecrire_flatgeobuf(table, sink):
+    import geopandas as gpd
+
+    geometry = gpd.GeoSeries.from_wkb(table.column("geometry").to_pylist(), crs=CRS)
+    gdf = gpd.GeoDataFrame(table.drop(["geometry"]).to_pandas(), geometry=geometry)
+    # Le driver FlatGeobuf écrit dans un fichier (index spatial calculé à la fin)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resultat.fgb")
+        gdf.to_file(path, driver="FlatGeobuf")
+        with open(path, "rb") as fichier:
+            sink.write(fichier.read())
+
+
+ECRITURES = {
+    "arrow": ecrire_arrow,
+    "flatgeobuf": ecrire_flatgeobuf,
+    "geoparquet": ecrire_geoparquet,
+}
+
+
+def preparer_spatiale(query, args, filtres=None, compte=None, cle=cle_id):
+    """
+    (format, requête filtrée, précision, page) d'une route spatiale :
+    paramètres ?format= et ?precision=, puis filtres.appliquer.
+    """
+    format = parse_format(args)
+    precision = parse_precision(args)
+    page = None
+    if filtres is not None:
+        query = filtres.appliquer(query, compte, cle)
+        page = filtres.page
+        if precision is None:
+            precision = filtres.precision
+    return format, query, precision, page
+
+
+def erreur_format(format: str, err: ImportError) -> dict:
+    return {
+        "error": "Format indisponible",
+        "detail": f"Le format '{format}' nécessite le module {err.name}",
+    }
+
+
+def reponse_spatiale(query, args, filtres=None, compte=None, cle=cle_id) -> Response:
+    """
+    Réponse d'une route spatiale dans le format demandé par ?format=
+    (geojson par défaut, arrow, flatgeobuf, geoparquet) et à la précision ?precision=.
+    filtres (FiltresSpatiaux) : min_count sur la colonne compte, zoom et
+    pagination selon cle. Le curseur de la page suivante est le membre
+    "next_cursor" en GeoJSON, l'en-tête X-Next-Cursor pour les autres formats.
+    """
+    format, query, precision, page = preparer_spatiale(query, args, filtres, compte, cle)
+    if format == "geojson":
+        return reponse_geojson(query, precision, page)
+
+    try:
+        table = table_arrow(query, precision, page)
+        sink = io.BytesIO()
+        with mesure("serialisation"):
+            ECRITURES[format](table, sink)
+    except ImportError as err:
+        return jsonify(erreur_format(format, err)), 501
+    response = Response(sink.getvalue(), mimetype=MIMETYPES[format])
+    if page is not None and page.curseur is not None:
+        response.headers["X-Next-Cursor"] = page.curseur
+    return response
@@ -0,0 +1,136 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import func, select
+
+from backend.utils.env import db
+from backend.utils.filtres import PREFIXE_CLE
+from backend.utils.timing import lots_mesures
+
+# Nombre de lignes lues par aller-retour sur le curseur serveur (défaut de
+# la clé de configuration TAILLE_LOT)
+TAILLE_LOT = 1000
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} n'est pas sérialisable en JSON")
+
+
+def dumps_proprietes(proprietes: dict) -> str:
+    return json.dumps(proprietes, default=_json_default, separators=(",", ":"))
+
+
+DEBUT_FEATURE_COLLECTION = '{"type":"FeatureCollection","features":['
+
+
+def features_lot(rows, proprietes: list[str], premier: bool) -> str:
+    # Texte des features d'un lot de lignes, précédé d'une virgule sauf en tête
+    chunk = []
+    separateur = "" if premier else ","
+    for row in rows:
+        valeurs = row._mapping
+        chunk.append(
+            f'{separateur}{{"type":"Feature","geometry":{valeurs["geom_geojson"] or "null"},'
+            f'"properties":{dumps_proprietes({name: valeurs[name] for name in proprietes})}}}'
+        )
+        separateur = ","
+    return "".join(chunk)
+
+
+def fin_feature_collection(membres=None) -> str:
+    fin = "".join(
+        f",{json.dumps(nom)}:{json.dumps(valeur, default=_json_default)}"
+        for nom, valeur in (membres() if membres else {}).items()
+        if valeur is not None
+    )
+    return f"]{fin}}}"
+
+
+def feature_collection_chunks(partitions, proprietes: list[str], membres=None):
+    """
+    Génère le texte d'une FeatureCollection à partir de lots de lignes
+    (geom_geojson, propriétés...). Le GeoJSON produit par PostGIS est inséré
+    tel quel, sans passer par json.loads.
+    membres : fonction appelée après le dernier lot, qui renvoie les membres
+    ajoutés à la FeatureCollection (next_cursor...).
+    """
+    yield DEBUT_FEATURE_COLLECTION
+    premier = True
+    for rows in partitions:
+        yield features_lot(rows, proprietes, premier)
+        premier = premier and not rows
+    yield fin_feature_collection(membres)
+
+
+async def feature_collection_chunks_async(partitions, proprietes: list[str], membres=None):
+    # Même texte que feature_collection_chunks, depuis un curseur asynchrone
+    yield DEBUT_FEATURE_COLLECTION
+    premier = True
+    async for rows in partitions:
+        yield features_lot(rows, proprietes, premier)
+        premier = premier and not rows
+    yield fin_feature_collection(membres)
+
+
+def colonnes_requete(subq):
+    # Propriétés des features et colonnes de clé de pagination (_cle0...)
+    proprietes = [
+        column
+        for column in subq.c
+        if column.key != "geom" and not column.key.startswith(PREFIXE_CLE)
+    ]
+    cles = [column for column in subq.c if column.key.startswith(PREFIXE_CLE)]
+    return proprietes, cles
+
+
+def geojson_select(query, precision=None):
+    """
+    Select (geom_geojson, propriétés...) pour une requête exposant sa géométrie
+    dans la colonne "geom", et la liste des noms de propriétés.
+    precision : nombre de décimales des coordonnées (9 par défaut dans PostGIS).
+    """
+    subq = query.subquery()
+    proprietes, cles = colonnes_requete(subq)
+    geojson = (
+        func.ST_AsGeoJSON(subq.c.geom)
+        if precision is None
+        else func.ST_AsGeoJSON(subq.c.geom, precision)
+    )
+    stmt = select(geojson.label("geom_geojson"), *proprietes, *cles).order_by(*cles)
+    return stmt, [column.key for column in proprietes]
+
+
+def reponse_geojson(query, precision=None, page=None) -> Response:
+    """
+    Réponse FeatureCollection envoyée par morceaux depuis un curseur serveur,
+    sans construire la liste complète des features en mémoire.
+    page : pagination (filtres.Page), le curseur de la page suivante est
+    ajouté en fin de flux dans le membre "next_cursor".
+    """
+    stmt, proprietes = geojson_select(query, precision)
+    # La requête est exécutée avant l'envoi des en-têtes : une erreur SQL
+    # donne encore une réponse 500 et non un flux tronqué
+    result = db.session.execute(
+        stmt.execution_options(
+            stream_results=True,
+            yield_per=current_app.config.get("TAILLE_LOT", TAILLE_LOT),
+        )
+    )
+    partitions = lots_mesures(result.partitions())
+    membres = None
+    if page is not None:
+        partitions = page.lots(partitions)
+
+        def membres():
+            return {"next_cursor": page.curseur}
+
+    return Response(
+        stream_with_context(feature_collection_chunks(partitions, proprietes, membres)),
+        mimetype="application/json",
+    )
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from backend.models.job import Job
+from backend.utils.cache import version_donnees
+from backend.utils.env import db
+from backend.utils.formats import ecrire_geoparquet, table_arrow
+from backend.utils.params import parse_cd_nom_ou_tous, parse_choix, parse_dates, parse_int
+from backend.utils.queries import SEUIL_PASSAGES, zones_sensibles_query
+
+STATUTS_ACTIFS = ("en_attente", "en_cours")
+
+
+def _parametres_zones_sensibles(args) -> dict:
+    # Mêmes paramètres que /api/zones-sensibles/batch, sous forme normalisée
+    date_min, date_max = parse_dates(args)
+    cd_nom_values = parse_cd_nom_ou_tous(args)
+    return {
+        "cd_nom": "all" if cd_nom_values is None else sorted(set(cd_nom_values)),
+        "date_min": date_min.isoformat(),
+        "date_max": date_max.isoformat(),
+        "geometry": parse_choix(args, "geometry", ("buffer", "point"), "buffer"),
+        "seuil": parse_int(args, "seuil", SEUIL_PASSAGES),
+    }
+
+
+def _requete_zones_sensibles(parametres):
+    return zones_sensibles_query(
+        None if parametres["cd_nom"] == "all" else parametres["cd_nom"],
+        date.fromisoformat(parametres["date_min"]),
+        date.fromisoformat(parametres["date_max"]),
+        geometrie=parametres["geometry"],
+        seuil=parametres["seuil"],
+    )
+
+
+# Types de jobs : (normalisation des paramètres de la requête, requête spatiale)
+TYPES_JOBS = {
+    "zones-sensibles": (_parametres_zones_sensibles, _requete_zones_sensibles),
+}
+
+
+def cle_job(type_job: str, parametres: dict) -> str:
+    version = version_donnees()
+    contenu = json.dumps(
+        {"type": type_job, "parametres": parametres, "version": version and version[0]},
+        sort_keys=True,
+    )
+    return hashlib.sha256(contenu.encode()).hexdigest()
+
+
+def soumettre(type_job: str, parametres: dict) -> Job:
+    """
+    Crée le job, ou renvoie le job identique en cours ou déjà terminé
+    (mêmes paramètres et même version des données).
+    """
+    cle = cle_job(type_job, parametres)
+    while True:
+        job = db.session.execute(
+            select(Job)
+            .where(Job.cle == cle, Job.statut != "erreur")
+            .order_by(Job.cree_le.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+        if job is not None and (job.statut != "termine" or os.path.exists(job.resultat)):
+            return job
+
+        job_id = db.session.execute(
+            insert(Job)
+            .values(type=type_job, parametres=parametres, cle=cle)
+            .on_conflict_do_nothing(
+                index_elements=[Job.cle], index_where=Job.statut.in_(STATUTS_ACTIFS)
+            )
+            .returning(Job.id)
+        ).scalar_one_or_none()
+        db.session.commit()
+        if job_id is not None:
+            return db.session.get(Job, job_id)
+        # Un job identique vient d'être créé par une autre requête : on le relit
+
+
+def reserver(delai_expiration: int, max_tentatives: int):
+    """
+    Réserve le plus ancien job en attente (ou en cours depuis plus de
+    delai_expiration secondes, worker arrêté), sans bloquer les autres workers.
+    Un job expiré déjà réservé max_tentatives fois passe en erreur.
+    """
+    expire = and_(
+        Job.statut == "en_cours",
+        Job.demarre_le < func.now() - timedelta(seconds=delai_expiration),
+    )
+    db.session.execute(
+        update(Job)
+        .where(expire, Job.tentatives >= max_tentatives)
+        .values(
+            statut="erreur",
+            erreur=f"Abandonné après {max_tentatives} tentatives interrompues",
+            termine_le=func.now(),
+        )
+    )
+    candidat = (
+        select(Job.id)
+        .where(or_(Job.statut == "en_attente", expire))
+        .order_by(Job.cree_le)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job_id = db.session.execute(
+        update(Job)
+        .where(Job.id == candidat)
+        .values(statut="en_cours", demarre_le=func.now(), tentatives=Job.tentatives + 1)
+        .returning(Job.id)
+    ).scalar_one_or_none()
+    db.session.commit()
+    return job_id
+
+
+def executer(job_id, dossier: str):
+    # Calcule le résultat en GeoParquet, écrit sous un nom temporaire puis renommé
+    job = db.session.get(Job, job_id)
+    chemin = os.path.join(dossier, f"{job.id}.parquet")
+    try:
+        query = TYPES_JOBS[job.type][1](job.parametres)
+        table = table_arrow(query)
+        os.makedirs(dossier, exist_ok=True)
+        with open(chemin + ".tmp", "wb") as fichier:
+            ecrire_geoparquet(table, fichier)
+        os.replace(chemin + ".tmp", chemin)
+    except Exception as err:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.statut, job.erreur = "erreur", str(err)
+    else:
+        job.statut, job.resultat = "termine", chemin
+    job.termine_le = func.now()
+    db.session.commit()
+    return job.statut
+
+
+def traiter_file(app):
+    """
+    Exécute les jobs en attente jusqu'à ce que la file soit vide
+    (tâche des threads du pool local).
+    """
+    with app.app_context():
+        while True:
+            job_id = reserver(app.config["JOBS_EXPIRATION"], app.config["JOBS_MAX_TENTATIVES"])
+            if job_id is None:
+                return
+            executer(job_id, app.config["JOBS_DIR"])
+
+
+def reveiller(app):
+    # Demande au pool local de traiter la file (sans effet si JOBS_WORKERS=0)
+    pool = app.extensions.get("jobs")
+    if pool is not None:
+        pool.submit(traiter_file, app)
+
+
+def init_jobs(app):
+    # JOBS_DIR : dossier partagé (volume commun) entre les instances de l'API et
+    # les workers, sans valeur par défaut : un dossier local à chaque hôte rendrait
+    # les résultats introuvables depuis les autres. Non configuré : jobs désactivés
+    app.config.setdefault("JOBS_DIR", None)
+    app.config.setdefault("JOBS_WORKERS", 2)
+    app.config.setdefault("JOBS_EXPIRATION", 3600)
+    app.config.setdefault("JOBS_MAX_TENTATIVES", 3)
+    if app.config["JOBS_DIR"] and app.config["JOBS_WORKERS"]:
+        app.extensions["jobs"] = ThreadPoolExecutor(
+            max_workers=app.config["JOBS_WORKERS"], thread_name_prefix="job"
+        )
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from flask import jsonify
+
+
+class ParametreInvalide(Exception):
+    """
+    Paramètre de requête manquant ou invalide (réponse 400)
+    """
+
+    def __init__(self, error: str, detail: str):
+        super().__init__(detail)
+        self.error = error
+        self.detail = detail
+
+
+def reponse_parametre_invalide(err: ParametreInvalide):
+    return jsonify({"error": err.error, "detail": err.detail}), 400
+
+
+def parse_cd_nom_list(args) -> list[int]:
+    # Accepte ?cd_nom=1&cd_nom=2 ou ?cd_nom=1,2
+    cd_nom_params = args.getlist("cd_nom")
+    if len(cd_nom_params) == 1 and "," in cd_nom_params[0]:
+        cd_nom_params = [part for part in cd_nom_params[0].split(",") if part]
+
+    cd_nom_values = []
+    for value in cd_nom_params:
+        try:
+            cd_nom_values.append(int(value))
+        except ValueError:
+            raise ParametreInvalide(
+                "Paramètre cd_nom invalide", f"'{value}' n'est pas un entier"
+            )
+    return cd_nom_values
+
+
+def parse_cd_nom(args) -> int:
+    cd_nom_str = args.get("cd_nom")
+    if not cd_nom_str:
+        raise ParametreInvalide(
+            "Paramètre manquant", "Le paramètre 'cd_nom' est requis"
+        )
+    if len(args.getlist("cd_nom")) > 1:
+        # Le cache trie les cd_nom répétés : ?cd_nom=1&cd_nom=2 et ?cd_nom=2&cd_nom=1
+        # auraient la même clé, alors que seul le premier serait lu ici
+        raise ParametreInvalide(
+            "Paramètre cd_nom invalide", "Une seule espèce attendue pour 'cd_nom'"
+        )
+    try:
+        return int(cd_nom_str)
+    except ValueError:
+        raise ParametreInvalide(
+            "Paramètre cd_nom invalide", f"'{cd_nom_str}' n'est pas un entier"
+        )
+
+
+def parse_cd_nom_ou_tous(args):
+    """
+    Liste d'espèces requise (comme parse_cd_nom_list), ou None pour
+    cd_nom=all : toutes les espèces des zones de quiétude.
+    """
+    if args.get("cd_nom") == "all":
+        return None
+    cd_nom_values = parse_cd_nom_list(args)
+    if not cd_nom_values:
+        raise ParametreInvalide(
+            "Paramètre manquant",
+            "Le paramètre 'cd_nom' est requis (liste d'entiers ou 'all')",
+        )
+    return cd_nom_values
+
+
+def parse_dates(args, requis: bool = True):
+    """
+    Retourne (date_min, date_max) depuis les paramètres date-min et date-max.
+    Si requis est faux, les deux paramètres peuvent être absents (None, None).
+    """
+    date_min_str = args.get("date-min")
+    date_max_str = args.get("date-max")
+
+    if not date_min_str or not date_max_str:
+        if not requis and not date_min_str and not date_max_str:
+            return None, None
+        raise ParametreInvalide(
+            "Paramètres manquants",
+            "Les paramètres 'date-min' et 'date-max' sont requis (format: YYYY-MM-DD)",
+        )
+
+    try:
+        date_min = datetime.strptime(date_min_str, "%Y-%m-%d").date()
+        date_max = datetime.strptime(date_max_str, "%Y-%m-%d").date()
+    except ValueError:
+        raise ParametreInvalide(
+            "Format de date invalide", "Les dates doivent être au format YYYY-MM-DD"
+        )
+    return date_min, date_max
+
+
+def parse_int(args, name: str, default: int) -> int:
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ParametreInvalide(
+            f"Paramètre {name} invalide", f"'{value}' n'est pas un entier"
+        )
+
+
+def parse_float(args, name: str, default: float, positif: bool = False) -> float:
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        nombre = float(value)
+    except ValueError:
+        raise ParametreInvalide(
+            f"Paramètre {name} invalide", f"'{value}' n'est pas un nombre"
+        )
+    if positif and not nombre > 0:
+        raise ParametreInvalide(
+            f"Paramètre {name} invalide", f"'{value}' n'est pas un nombre positif"
+        )
+    return nombre
+
+
+def parse_choix(args, name: str, choix: tuple[str, ...], default: str) -> str:
+    value = args.get(name, default)
+    if value not in choix:
+        raise ParametreInvalide(
+            f"Paramètre {name} invalide",
+            f"'{value}' n'est pas une valeur possible ({', '.join(choix)})",
+        )
+    return value
@@ -0,0 +1,174 @@
+from sqlalchemy import BigInteger, Integer, and_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import ProgrammingError
+
+from backend.models.grille_passage import GrillePassage, GrillePassageEtat
+from backend.models.trace import Grille, Trace
+from backend.utils.env import db
+
+# Requêtes d'état, exécutées aussi par le service ASGI (backend/asgi.py)
+ETAT_TRACES = select(func.count(Trace.id), func.max(Trace.id))
+ETAT_CUBE = select(GrillePassageEtat.trace_count, GrillePassageEtat.trace_max_id)
+ETAT_GRILLE = select(func.count(Grille.id), func.max(Grille.id))
+
+
+def etat_traces():
+    # (nombre de traces, id maximal) : change à chaque import de traces
+    return tuple(db.session.execute(ETAT_TRACES).one())
+
+
+def etat_grille():
+    # (nombre de mailles, id maximal) : change si grille_200_4326 est rechargée
+    return tuple(db.session.execute(ETAT_GRILLE).one())
+
+
+def cube_a_jour(etat=None) -> bool:
+    """
+    Indique si le cube grille_passage reflète le contenu actuel de la table trace.
+    """
+    try:
+        etat_cube = db.session.execute(ETAT_CUBE).first()
+    except ProgrammingError:
+        # Migration create_grille_passage.sql pas encore appliquée
+        db.session.rollback()
+        return False
+    if etat_cube is None:
+        return False
+
+    if etat is None:
+        etat = etat_traces()
+    return tuple(etat) == tuple(etat_cube)
+
+
+def raster_a_jour(etat=None, grille=None):
+    """
+    Cube raster des passages (flask raster build) s'il reflète le contenu
+    actuel des tables trace et grille_200_4326, sinon None.
+    grille : ligne de ETAT_GRILLE, lue en base si elle n'est pas fournie.
+    """
+    try:
+        from backend.utils.raster import charger_cube
+    except ImportError:
+        return None
+    cube = charger_cube()
+    if cube is None:
+        return None
+    if etat is None:
+        etat = etat_traces()
+    if cube.etat != tuple(etat):
+        return None
+    if grille is None:
+        grille = etat_grille()
+    return cube if cube.etat_grille == tuple(grille) else None
+
+
+def source_passages(etat, etat_cube, grille=None):
+    """
+    Source des passages par maille pour l'état des traces déjà lu : "cube"
+    (grille_passage, prioritaire), cube raster (CubeRaster) si seul celui-ci
+    est à jour, sinon "jointure".
+    etat_cube : ligne de ETAT_CUBE, None si le cube n'a jamais été calculé.
+    grille : ligne de ETAT_GRILLE, lue en base si le raster est consulté.
+    """
+    if etat_cube is not None and tuple(etat_cube) == tuple(etat):
+        return "cube"
+    cube = raster_a_jour(etat, grille)
+    if cube is not None:
+        return cube
+    return "jointure"
+
+
+def _cumul_au(date_clause):
+    # Cumul de la maille au dernier jour vérifiant date_clause (0 si aucun)
+    return func.coalesce(
+        select(GrillePassage.nb_passages_cumul)
+        .where(GrillePassage.grille_id == Grille.id, date_clause)
+        .order_by(GrillePassage.date.desc())
+        .limit(1)
+        .correlate(Grille)
+        .scalar_subquery(),
+        0,
+    )
+
+
+def _passages_depuis_cube(date_min, date_max):
+    # Différence de sommes préfixes : deux lectures d'index par maille
+    nb_passages = _cumul_au(GrillePassage.date <= date_max) - _cumul_au(
+        GrillePassage.date < date_min
+    )
+    return select(Grille.id.label("id"), nb_passages.label("nb_passages"))
+
+
+def _passages_depuis_raster(cube, date_min, date_max):
+    # Somme des jours de la fenêtre dans le cube raster ; seules les mailles
+    # avec passages sont transmises à PostgreSQL, les autres valent 0
+    nb_passages = cube.passages(date_min, date_max)
+    non_nuls = nb_passages.nonzero()[0]
+    raster = (
+        func.unnest(
+            bindparam("ids", cube.mailles[non_nuls].tolist(), ARRAY(Integer), unique=True),
+            bindparam("nb", nb_passages[non_nuls].tolist(), ARRAY(BigInteger), unique=True),
+        )
+        .table_valued("id", "nb_passages")
+        .render_derived(name="raster_passages")
+    )
+    return select(
+        Grille.id.label("id"),
+        func.coalesce(raster.c.nb_passages, 0).label("nb_passages"),
+    ).outerjoin(raster, raster.c.id == Grille.id)
+
+
+def _passages_jointure(date_min, date_max):
+    # Jointure spatiale complète, utilisée tant que le cube n'est pas à jour
+    traces_filtered = (
+        select(Trace)
+        .where(Trace.date_start >= date_min, Trace.date_start <= date_max)
+        .subquery()
+    )
+    TraceFiltered = db.aliased(Trace, traces_filtered)
+
+    return (
+        select(
+            Grille.id.label("id"),
+            func.count(TraceFiltered.id).label("nb_passages"),
+        )
+        .outerjoin(
+            TraceFiltered,
+            and_(
+                Grille.geom.op("&&")(TraceFiltered.geom),  # Bounding box check (rapide)
+                func.ST_Intersects(Grille.geom, TraceFiltered.geom),  # Intersection précise
+            ),
+        )
+        .group_by(Grille.id)
+    )
+
+
+def passages_par_grille(date_min, date_max, emprise=None, source=None):
+    """
+    Sous-requête (id, nb_passages) : nombre de traces démarrant entre date_min
+    et date_max qui intersectent chaque maille de la grille.
+    Lit le cube pré-calculé s'il est à jour, à défaut le cube raster, sinon
+    refait la jointure spatiale.
+    emprise (géométrie 4326) limite le calcul aux mailles qu'elle recouvre.
+    source : résultat de source_passages, lu en base s'il n'est pas fourni.
+    """
+    if source is None:
+        etat = etat_traces()
+        if cube_a_jour(etat):
+            source = "cube"
+        else:
+            source = raster_a_jour(etat)
+            if source is None:
+                source = "jointure"
+
+    if source == "jointure":
+        query = _passages_jointure(date_min, date_max)
+    elif source == "cube":
+        query = _passages_depuis_cube(date_min, date_max)
+    else:
+        query = _passages_depuis_raster(source, date_min, date_max)
+
+    query = query.where(Grille.geom.isnot(None))
+    if emprise is not None:
+        query = query.where(Grille.geom.op("&&")(emprise))
+    return query.subquery("grilles_passages")
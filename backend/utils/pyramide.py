@@ -0,0 +1,36 @@
+import math
+
+from sqlalchemy import select
+from sqlalchemy.exc import ProgrammingError
+
+from backend.models.obs_pyramide import ObsPyramideEtat
+from backend.utils.env import db
+
+# État de la pyramide (ligne absente : à recalculer)
+ETAT_PYRAMIDE = select(ObsPyramideEtat.id)
+
+# Résolutions de /api/grid (degrés), niveaux 0 à 4 de ardeche.obs_pyramide.
+# Chaque niveau est un multiple entier du niveau 0 (migrations/create_obs_pyramide.sql)
+NIVEAUX_GRILLE = (0.001, 0.002, 0.01, 0.02, 0.1)
+FACTEURS_GRILLE = (1, 2, 10, 20, 100)
+
+
+def niveau_grille(cell_size: float) -> int:
+    # Niveau dont la résolution est la plus proche (en échelle logarithmique)
+    return min(
+        range(len(NIVEAUX_GRILLE)),
+        key=lambda niveau: abs(math.log(NIVEAUX_GRILLE[niveau] / cell_size)),
+    )
+
+
+def pyramide_a_jour() -> bool:
+    """
+    Indique si la pyramide reflète la table obs (l'état est vidé par un
+    trigger à chaque modification d'obs).
+    """
+    try:
+        return db.session.execute(ETAT_PYRAMIDE).first() is not None
+    except ProgrammingError:
+        # Migration create_obs_pyramide.sql pas encore appliquée
+        db.session.rollback()
+        return False
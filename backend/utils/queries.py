@@ -0,0 +1,153 @@
+from sqlalchemy import func, select
+
+from backend.models.obs import Obs
+from backend.models.obs_pyramide import ObsPyramide
+from backend.models.quiet_zone import QuietZone
+from backend.models.trace import Grille
+from backend.utils.passages import passages_par_grille
+from backend.utils.pyramide import (
+    FACTEURS_GRILLE,
+    NIVEAUX_GRILLE,
+    niveau_grille,
+    pyramide_a_jour,
+)
+
+# Une zone est sensible si une maille à moins de 50m a plus de passages (par défaut)
+SEUIL_PASSAGES = 50
+BUFFER_METRES = 50
+
+# Les requêtes ci-dessous exposent leur géométrie (4326) dans la colonne "geom",
+# les autres colonnes sont les propriétés des features. Elles sont partagées par
+# les routes GeoJSON et les tuiles vectorielles.
+
+
+def obs_grid_query(
+    cell_size, cd_nom_values, date_min=None, date_max=None, emprise=None, pyramide=None
+):
+    """
+    Nombre d'observations par maille, au niveau de NIVEAUX_GRILLE le plus proche
+    de cell_size ; chaque maille est représentée par son centre.
+    Lu dans la pyramide pré-calculée si elle est à jour et sans filtre de dates
+    (dates au jour, pyramide au mois), sinon calculé depuis obs.
+    pyramide : fraîcheur de la pyramide si elle est déjà connue.
+    """
+    niveau = niveau_grille(cell_size)
+    taille = NIVEAUX_GRILLE[niveau]
+
+    def centre(ix, iy):
+        return func.ST_SetSRID(
+            func.ST_MakePoint((ix + 0.5) * taille, (iy + 0.5) * taille), 4326
+        )
+
+    if date_min is None and (pyramide if pyramide is not None else pyramide_a_jour()):
+        ix, iy = ObsPyramide.ix, ObsPyramide.iy
+        query = select(
+            centre(ix, iy).label("geom"),
+            func.sum(ObsPyramide.nb).label("count"),
+        ).where(ObsPyramide.niveau == niveau)
+        if cd_nom_values:
+            query = query.where(ObsPyramide.cd_nom.in_(cd_nom_values))
+        if emprise is not None:
+            query = query.where(centre(ix, iy).op("&&")(emprise))
+        return query.group_by(ix, iy)
+
+    # Mêmes indices que la pyramide : maille du niveau 0, puis du niveau demandé
+    facteur = FACTEURS_GRILLE[niveau]
+    ix = func.floor(func.floor(func.ST_X(Obs.geom) / NIVEAUX_GRILLE[0]) / facteur)
+    iy = func.floor(func.floor(func.ST_Y(Obs.geom) / NIVEAUX_GRILLE[0]) / facteur)
+    query = select(
+        centre(ix, iy).label("geom"),
+        func.count().label("count"),
+    ).where(Obs.geom.isnot(None))
+
+    if cd_nom_values:
+        query = query.where(Obs.cd_nom.in_(cd_nom_values))
+    if date_min is not None:
+        query = query.where(Obs.date_debut >= date_min, Obs.date_debut <= date_max)
+    if emprise is not None:
+        query = query.where(Obs.geom.op("&&")(emprise))
+
+    return query.group_by(ix, iy)
+
+
+def analyse_query(date_min, date_max, emprise=None, source=None):
+    # Mailles de la grille et leur nombre de passages sur la période
+    passages = passages_par_grille(date_min, date_max, emprise, source)
+    return select(
+        Grille.id,
+        Grille.geom.label("geom"),
+        passages.c.nb_passages,
+    ).join(passages, passages.c.id == Grille.id)
+
+
+def zones_sensibles_query(
+    cd_nom_values,
+    date_min,
+    date_max,
+    emprise=None,
+    geometrie="buffer",
+    seuil=SEUIL_PASSAGES,
+    source=None,
+):
+    """
+    Observations des espèces sur la période et nb_passages maximal des mailles
+    situées à moins de 50m (ST_DWithin en Lambert-93, servi par les index GiST).
+    cd_nom_values : liste de cd_nom, ou None pour toutes les espèces de quiet_zone.
+    Les passages par maille sont calculés une seule fois pour toutes les espèces.
+    geometrie : "buffer" renvoie le buffer de 50m de l'observation, "point" le point.
+    Une observation est en zone sensible si nb_passages_max > seuil.
+    source : source des passages (passages.source_passages), lue sinon en base.
+    """
+    # Sous-requête avec les grilles et leur nb_passages (même logique que /analyse)
+    # L'emprise des mailles est élargie pour couvrir les buffers en bordure
+    passages = passages_par_grille(
+        date_min,
+        date_max,
+        func.ST_Expand(emprise, 0.001) if emprise is not None else None,
+        source,
+    )
+
+    if cd_nom_values is None:
+        cd_nom_filter = Obs.cd_nom.in_(select(QuietZone.cd_nom).distinct())
+    else:
+        cd_nom_filter = Obs.cd_nom.in_(cd_nom_values)
+    obs_filtered = select(Obs.id, Obs.geom_2154).where(
+        Obs.date_debut >= date_min,
+        Obs.date_debut <= date_max,
+        cd_nom_filter,
+        Obs.geom.isnot(None),
+    )
+    if emprise is not None:
+        obs_filtered = obs_filtered.where(Obs.geom.op("&&")(emprise))
+    obs_filtered_subq = obs_filtered.subquery()
+
+    # Mailles à moins de 50m de chaque observation : la jointure spatiale se fait
+    # sur la table grille (index GiST), les passages sont rattachés par id
+    sensibilite_subq = (
+        select(
+            obs_filtered_subq.c.id,
+            func.coalesce(func.max(passages.c.nb_passages), 0).label("nb_passages_max"),
+        )
+        .select_from(obs_filtered_subq)
+        .outerjoin(
+            Grille,
+            func.ST_DWithin(obs_filtered_subq.c.geom_2154, Grille.geom_2154, BUFFER_METRES),
+        )
+        .outerjoin(passages, passages.c.id == Grille.id)
+        .group_by(obs_filtered_subq.c.id)
+        .subquery()
+    )
+
+    if geometrie == "buffer":
+        # Buffer de 50m calculé en Lambert-93 puis ramené en WGS84
+        geom = func.ST_Transform(func.ST_Buffer(Obs.geom_2154, BUFFER_METRES), 4326)
+    else:
+        geom = Obs.geom
+
+    return select(
+        Obs.id,
+        geom.label("geom"),
+        Obs.cd_nom,
+        (sensibilite_subq.c.nb_passages_max > seuil).label("zone_sensible"),
+        sensibilite_subq.c.nb_passages_max,
+    ).join(sensibilite_subq, sensibilite_subq.c.id == Obs.id)
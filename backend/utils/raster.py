@@ -0,0 +1,82 @@
+import json
+import os
+from datetime import date
+
+import numpy as np
+from flask import current_app
+
+# Cube raster des passages (flask raster build), lu par /api/analyse s'il est à
+# jour et que le cube grille_passage ne l'est pas
+RASTER_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "raster_passages")
+FICHIER_META = "cube.json"
+FICHIER_CUBE = "passages.npy"
+FICHIER_MAILLES = "mailles.npy"
+TAILLE_MAILLE = 200
+
+# Cubes ouverts par ce processus, par dossier et date de modification
+_cubes = {}
+
+
+class CubeRaster:
+    """
+    Nombre de passages par jour et par maille (uint16), en tableau mappé en
+    mémoire. Les jours sont en première dimension : une fenêtre de dates est un
+    bloc contigu de lignes, sommé en une opération vectorisée.
+    mailles : ids de grille_200_4326 dans l'ordre des colonnes ;
+    positions : (ligne, colonne) de chaque maille dans le raster 200m Lambert-93.
+    """
+
+    def __init__(self, dossier):
+        with open(os.path.join(dossier, FICHIER_META), encoding="utf-8") as fichier:
+            self.meta = json.load(fichier)
+        self.date_debut = date.fromisoformat(self.meta["date_debut"])
+        self.cube = np.load(os.path.join(dossier, FICHIER_CUBE), mmap_mode="r")
+        mailles = np.load(os.path.join(dossier, FICHIER_MAILLES))
+        self.mailles = mailles["id"]
+        self.positions = np.stack([mailles["ligne"], mailles["colonne"]], axis=1)
+
+    @property
+    def etat(self):
+        # (trace_count, trace_max_id) de la table trace au moment du calcul
+        return self.meta["trace_count"], self.meta["trace_max_id"]
+
+    @property
+    def etat_grille(self):
+        # (nombre de mailles, id maximal) de grille_200_4326 au moment du calcul ;
+        # (None, None) pour un cube antérieur, considéré comme périmé
+        return self.meta.get("grille_count"), self.meta.get("grille_max_id")
+
+    def passages(self, date_min, date_max):
+        # Passages par maille entre date_min et date_max inclus
+        debut = max(0, (date_min - self.date_debut).days)
+        fin = min(self.cube.shape[0], (date_max - self.date_debut).days + 1)
+        if debut >= fin:
+            return np.zeros(self.cube.shape[1], dtype=np.int64)
+        return self.cube[debut:fin].sum(axis=0, dtype=np.int64)
+
+    def grille(self, valeurs, vide=0):
+        # Valeurs par maille replacées dans le raster (lignes du nord au sud)
+        lignes, colonnes = self.meta["lignes"], self.meta["colonnes"]
+        raster = np.full((lignes, colonnes), vide, dtype=valeurs.dtype)
+        raster[self.positions[:, 0], self.positions[:, 1]] = valeurs
+        return raster
+
+
+def charger_cube(dossier=None):
+    """
+    Cube raster du dossier (RASTER_PASSAGES_DIR par défaut), ou None s'il n'a
+    pas été calculé. Le mapping mémoire est partagé entre les requêtes.
+    """
+    if dossier is None:
+        dossier = current_app.config.get("RASTER_PASSAGES_DIR", RASTER_DIR)
+    if not dossier:
+        return None
+    chemin = os.path.join(dossier, FICHIER_META)
+    try:
+        modifie = os.path.getmtime(chemin)
+    except OSError:
+        return None
+    cle = os.path.abspath(dossier)
+    if cle not in _cubes or _cubes[cle][0] != modifie:
+        _cubes[cle] = (modifie, CubeRaster(dossier))
+    return _cubes[cle][1]
@@ -0,0 +1,202 @@
+import os
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+
+# Emprise des gorges de l'Ardèche en Lambert-93 (EPSG:2154)
+EMPRISE_2154 = (800000, 6350000, 835000, 6375000)
+TAILLE_MAILLE = 200
+
+# Volumes à l'échelle 1 (ordre de grandeur 2020-2024)
+NB_TRACES = 20000
+NB_OBS = 30000
+CD_NOMS = (2656, 2938, 2669, 2840, 3465, 2645)
+
+# Tables au format des modèles (Obs, Trace, Grille), créées si la base est vide
+TABLES_SQL = """
+CREATE SCHEMA IF NOT EXISTS ardeche;
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+CREATE TABLE IF NOT EXISTS ardeche.obs (
+    id SERIAL PRIMARY KEY,
+    geom geometry(POINT, 4326),
+    cd_nom INTEGER,
+    group2_inpn TEXT,
+    niveau_sensibilite TEXT,
+    nom_valide TEXT,
+    date_debut TIMESTAMP,
+    date_fin TIMESTAMP,
+    behaviour TEXT,
+    species_age TEXT,
+    year_date INTEGER,
+    year_month INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS ardeche.trace (
+    id SERIAL PRIMARY KEY,
+    track_id INTEGER,
+    date_start DATE,
+    date_end DATE,
+    geom geometry(MULTIPOLYGON, 4326)
+);
+
+CREATE TABLE IF NOT EXISTS ardeche.grille_200_4326 (
+    id SERIAL PRIMARY KEY,
+    geom geometry(MULTIPOLYGON, 4326)
+);
+
+-- Les modèles utilisent des noms de tables non qualifiés
+DO $$
+BEGIN
+    EXECUTE format('ALTER DATABASE %I SET search_path = ardeche, public', current_database());
+END
+$$;
+"""
+
+GRILLE_SQL = """
+INSERT INTO ardeche.grille_200_4326 (geom)
+SELECT ST_Multi(ST_Transform(ST_MakeEnvelope(x, y, x + %(taille)s, y + %(taille)s, 2154), 4326))
+FROM generate_series(%(xmin)s, %(xmax)s - %(taille)s, %(taille)s) AS x,
+     generate_series(%(ymin)s, %(ymax)s - %(taille)s, %(taille)s) AS y
+ORDER BY y, x;
+"""
+
+# Traces GPX : marches aléatoires de 30 points bufferisées à 10m, insérées
+# dans l'ordre chronologique comme un import ogr2ogr
+TRACES_SQL = """
+WITH depart AS (
+    SELECT
+        t,
+        %(xmin)s + random() * (%(xmax)s - %(xmin)s) AS x0,
+        %(ymin)s + random() * (%(ymax)s - %(ymin)s) AS y0,
+        DATE '2020-01-01' + floor(random() * 1827)::int AS jour
+    FROM generate_series(1, %(nb)s) AS t
+),
+pas AS (
+    SELECT
+        t,
+        i,
+        sum(random() * 400 - 200) OVER w AS dx,
+        sum(random() * 400 - 200) OVER w AS dy
+    FROM generate_series(1, %(nb)s) AS t, generate_series(1, 30) AS i
+    WINDOW w AS (PARTITION BY t ORDER BY i)
+),
+lignes AS (
+    SELECT pas.t, ST_MakeLine(ST_MakePoint(depart.x0 + pas.dx, depart.y0 + pas.dy) ORDER BY pas.i) AS geom
+    FROM pas
+    JOIN depart USING (t)
+    GROUP BY pas.t
+)
+INSERT INTO ardeche.trace (track_id, date_start, date_end, geom)
+SELECT
+    depart.t,
+    depart.jour,
+    depart.jour,
+    ST_Multi(ST_Transform(ST_Buffer(ST_SetSRID(lignes.geom, 2154), 10), 4326))
+FROM depart
+JOIN lignes USING (t)
+ORDER BY depart.jour;
+"""
+
+OBS_SQL = """
+INSERT INTO ardeche.obs (
+    geom, cd_nom, group2_inpn, niveau_sensibilite, nom_valide,
+    date_debut, date_fin, behaviour, species_age, year_date, year_month
+)
+SELECT
+    ST_Transform(ST_SetSRID(ST_MakePoint(x, y), 2154), 4326),
+    cd_nom,
+    'Oiseaux',
+    (ARRAY['faible', 'moyen', 'fort'])[1 + floor(random() * 3)::int],
+    'Espèce ' || cd_nom,
+    jour,
+    jour,
+    (ARRAY['nidification', 'alimentation', 'passage'])[1 + floor(random() * 3)::int],
+    (ARRAY['adulte', 'juvénile', 'inconnu'])[1 + floor(random() * 3)::int],
+    extract(year FROM jour)::int,
+    extract(month FROM jour)::int
+FROM (
+    SELECT
+        %(xmin)s + random() * (%(xmax)s - %(xmin)s) AS x,
+        %(ymin)s + random() * (%(ymax)s - %(ymin)s) AS y,
+        (%(cd_noms)s::int[])[1 + floor(random() * %(nb_cd_noms)s)::int] AS cd_nom,
+        TIMESTAMP '2020-01-01' + random() * INTERVAL '1826 days' AS jour
+    FROM generate_series(1, %(nb)s)
+) AS tirage;
+"""
+
+QUIET_ZONE_SQL = """
+INSERT INTO ardeche.quiet_zone (cd_nom, nom_valide, geom)
+SELECT
+    cd_nom,
+    'Zone ' || cd_nom,
+    ST_Multi(ST_Transform(ST_Buffer(ST_SetSRID(ST_MakePoint(
+        %(xmin)s + random() * (%(xmax)s - %(xmin)s),
+        %(ymin)s + random() * (%(ymax)s - %(ymin)s)
+    ), 2154), 800), 4326))
+FROM unnest(%(cd_noms)s::int[]) AS cd_nom;
+"""
+
+# Migrations du dépôt appliquées après le chargement, dans l'ordre
+MIGRATIONS = (
+    "create_import_tables.sql",
+    "add_geom_2154.sql",
+    "create_indexes.sql",
+    "create_grille_passage.sql",
+    "create_obs_pyramide.sql",
+    "create_data_version.sql",
+)
+
+
+def executer_migration(cursor, nom):
+    with open(os.path.join(MIGRATIONS_DIR, nom), encoding="utf-8") as fichier:
+        cursor.execute(fichier.read())
+
+
+def tables_vides(cursor) -> bool:
+    for table in ("ardeche.obs", "ardeche.trace", "ardeche.grille_200_4326"):
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        if not cursor.fetchone()[0]:
+            continue
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+        if cursor.fetchone()[0]:
+            return False
+    return True
+
+
+def generer_donnees(connection, echelle: float = 1.0):
+    """
+    Remplit obs, trace, grille_200_4326 et quiet_zone avec des données
+    synthétiques à l'échelle des gorges de l'Ardèche (echelle=10 : 10× plus de
+    traces et d'observations), applique les migrations et calcule le cube.
+    Les tables existantes sont vidées.
+    """
+    xmin, ymin, xmax, ymax = EMPRISE_2154
+    params = {
+        "xmin": xmin,
+        "ymin": ymin,
+        "xmax": xmax,
+        "ymax": ymax,
+        "taille": TAILLE_MAILLE,
+        "cd_noms": list(CD_NOMS),
+        "nb_cd_noms": len(CD_NOMS),
+    }
+
+    cursor = connection.cursor()
+    cursor.execute(TABLES_SQL)
+    executer_migration(cursor, "create_import_tables.sql")
+    cursor.execute(
+        "TRUNCATE ardeche.obs, ardeche.trace, ardeche.grille_200_4326, ardeche.quiet_zone"
+        " RESTART IDENTITY CASCADE"
+    )
+    cursor.execute(GRILLE_SQL, params)
+    cursor.execute(TRACES_SQL, {**params, "nb": int(NB_TRACES * echelle)})
+    cursor.execute(OBS_SQL, {**params, "nb": int(NB_OBS * echelle)})
+    cursor.execute(QUIET_ZONE_SQL, params)
+    connection.commit()
+
+    for nom in MIGRATIONS[1:]:
+        executer_migration(cursor, nom)
+    cursor.execute("SELECT ardeche.refresh_grille_passage()")
+    cursor.execute("SELECT ardeche.refresh_obs_pyramide()")
+    cursor.execute("SELECT ardeche.bump_data_version()")
+    connection.commit()
@@ -0,0 +1,253 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bornes (secondes) de l'histogramme des durées de requête
+BORNES_DUREE = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Mesures:
+    """
+    Temps passé par étape pendant une requête HTTP : exécution SQL, lecture
+    des lignes (fetch), sérialisation, ainsi que lignes lues et octets envoyés.
+    """
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.durees = {}
+        self.nb_sql = 0
+        self.lignes = 0
+        self.octets = 0
+
+    def ajouter(self, etape: str, duree: float):
+        self.durees[etape] = self.durees.get(etape, 0.0) + duree
+
+    def server_timing(self, total: float) -> str:
+        entrees = [
+            f"{etape};dur={duree * 1000:.1f}" for etape, duree in self.durees.items()
+        ]
+        if self.nb_sql:
+            entrees.append(f'requetes;desc="{self.nb_sql} SQL"')
+        entrees.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entrees)
+
+
+def mesures_courantes():
+    # None hors requête (commandes CLI, benchmarks sans contexte)
+    if not has_app_context():
+        return None
+    return g.get("mesures")
+
+
+@contextmanager
+def mesure(etape: str):
+    """
+    Ajoute la durée du bloc à l'étape de la requête en cours.
+    Utilisable aussi en décorateur : @mesure("etape").
+    """
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        mesures = mesures_courantes()
+        if mesures is not None:
+            mesures.ajouter(etape, time.perf_counter() - debut)
+
+
+def compter_lignes(nb: int):
+    mesures = mesures_courantes()
+    if mesures is not None:
+        mesures.lignes += nb
+
+
+def lots_mesures(partitions):
+    """
+    Lots de lignes d'un curseur serveur, en comptant les lignes lues et le
+    temps passé à les attendre (étape fetch).
+    """
+    iterateur = iter(partitions)
+    while True:
+        debut = time.perf_counter()
+        try:
+            rows = next(iterateur)
+        except StopIteration:
+            return
+        finally:
+            mesures = mesures_courantes()
+            if mesures is not None:
+                mesures.ajouter("fetch", time.perf_counter() - debut)
+        compter_lignes(len(rows))
+        yield rows
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _avant_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info["debut_sql"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _apres_sql(conn, cursor, statement, parameters, context, executemany):
+    debut = conn.info.pop("debut_sql", None)
+    if debut is None:
+        # Exécution commencée avant l'enregistrement de l'écouteur : non mesurée
+        return
+    mesures = mesures_courantes()
+    if mesures is not None:
+        mesures.ajouter("sql", time.perf_counter() - debut)
+        mesures.nb_sql += 1
+
+
+class Registre:
+    """
+    Compteurs cumulés par route depuis le démarrage du processus, exposés au
+    format texte Prometheus. Chaque worker gunicorn a son propre registre.
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.requetes = {}
+        self.etapes = {}
+        self.sql = {}
+        self.lignes = {}
+        self.octets = {}
+        self.histogramme = {}
+
+    def enregistrer(self, route: str, statut: int, mesures: Mesures, total: float):
+        with self._verrou:
+            cle = (route, str(statut))
+            self.requetes[cle] = self.requetes.get(cle, 0) + 1
+            for etape, duree in mesures.durees.items():
+                self.etapes[(route, etape)] = self.etapes.get((route, etape), 0.0) + duree
+            self.sql[route] = self.sql.get(route, 0) + mesures.nb_sql
+            self.lignes[route] = self.lignes.get(route, 0) + mesures.lignes
+            self.octets[route] = self.octets.get(route, 0) + mesures.octets
+            compteurs, somme = self.histogramme.get(route, ([0] * len(BORNES_DUREE), 0.0))
+            for i, borne in enumerate(BORNES_DUREE):
+                if total <= borne:
+                    compteurs[i] += 1
+            self.histogramme[route] = (compteurs, somme + total)
+
+    def prometheus(self) -> str:
+        lignes = []
+
+        def metrique(nom, type, aide, valeurs):
+            lignes.append(f"# HELP {nom} {aide}")
+            lignes.append(f"# TYPE {nom} {type}")
+            for labels, valeur in valeurs:
+                texte = ",".join(f'{cle}="{val}"' for cle, val in labels)
+                lignes.append(f"{nom}{{{texte}}} {valeur}")
+
+        with self._verrou:
+            metrique(
+                "ardeche_requetes_total",
+                "counter",
+                "Requêtes HTTP traitées",
+                [((("route", r), ("statut", s)), n) for (r, s), n in sorted(self.requetes.items())],
+            )
+            metrique(
+                "ardeche_etape_secondes_total",
+                "counter",
+                "Temps cumulé par étape (sql, fetch, serialisation)",
+                [((("route", r), ("etape", e)), f"{d:.6f}") for (r, e), d in sorted(self.etapes.items())],
+            )
+            metrique(
+                "ardeche_sql_requetes_total",
+                "counter",
+                "Requêtes SQL exécutées",
+                [((("route", r),), n) for r, n in sorted(self.sql.items())],
+            )
+            metrique(
+                "ardeche_lignes_total",
+                "counter",
+                "Lignes lues en base",
+                [((("route", r),), n) for r, n in sorted(self.lignes.items())],
+            )
+            metrique(
+                "ardeche_reponse_octets_total",
+                "counter",
+                "Octets envoyés dans les corps de réponse",
+                [((("route", r),), n) for r, n in sorted(self.octets.items())],
+            )
+            lignes.append("# HELP ardeche_requete_duree_secondes Durée totale des requêtes")
+            lignes.append("# TYPE ardeche_requete_duree_secondes histogram")
+            for route, (compteurs, somme) in sorted(self.histogramme.items()):
+                for borne, nb in zip(BORNES_DUREE, compteurs):
+                    lignes.append(
+                        f'ardeche_requete_duree_secondes_bucket{{route="{route}",le="{borne}"}} {nb}'
+                    )
+                total = self.requetes_route(route)
+                lignes.append(
+                    f'ardeche_requete_duree_secondes_bucket{{route="{route}",le="+Inf"}} {total}'
+                )
+                lignes.append(f'ardeche_requete_duree_secondes_sum{{route="{route}"}} {somme:.6f}')
+                lignes.append(f'ardeche_requete_duree_secondes_count{{route="{route}"}} {total}')
+        return "\n".join(lignes) + "\n"
+
+    def requetes_route(self, route: str) -> int:
+        return sum(n for (r, _), n in self.requetes.items() if r == route)
+
+
+registre = Registre()
+
+
+def _flux_mesure(morceaux, mesures, terminer):
+    # Sérialisation d'un flux : temps passé à produire les morceaux, hors fetch
+    fetch_avant = mesures.durees.get("fetch", 0.0)
+    duree = 0.0
+    try:
+        iterateur = iter(morceaux)
+        while True:
+            debut = time.perf_counter()
+            try:
+                morceau = next(iterateur)
+            except StopIteration:
+                break
+            finally:
+                duree += time.perf_counter() - debut
+            if isinstance(morceau, str):
+                morceau = morceau.encode()
+            mesures.octets += len(morceau)
+            yield morceau
+    finally:
+        mesures.ajouter("serialisation", duree - (mesures.durees.get("fetch", 0.0) - fetch_avant))
+        terminer()
+
+
+def init_timing(app):
+    """
+    Mesure chaque requête : en-tête Server-Timing et registre exposé par
+    /api/_metrics. Pour une réponse envoyée en flux, l'en-tête ne contient que
+    les étapes terminées avant l'envoi ; le registre reçoit le total à la fin du flux.
+    """
+
+    @app.before_request
+    def _debut():
+        g.mesures = Mesures()
+
+    @app.after_request
+    def _fin(response):
+        # g.mesures reste accessible au générateur (stream_with_context)
+        mesures = g.get("mesures")
+        if mesures is None:
+            return response
+        route = request.endpoint or "inconnue"
+        statut = response.status_code
+
+        def terminer():
+            registre.enregistrer(route, statut, mesures, time.perf_counter() - mesures.debut)
+
+        timing = mesures.server_timing(time.perf_counter() - mesures.debut)
+        if response.headers.get("X-Cache"):
+            timing += f', cache;desc="{response.headers["X-Cache"]}"'
+        response.headers["Server-Timing"] = timing
+
+        if response.is_streamed:
+            response.response = _flux_mesure(response.response, mesures, terminer)
+        else:
+            mesures.octets = response.calculate_content_length() or 0
+            terminer()
+        return response
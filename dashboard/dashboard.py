@@ -1,7 +1,16 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from functools import lru_cache
 from os import truncate
 import dash
-from dash import dcc
+from dash import Patch, dcc
 from dash import html
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State
@@ -10,10 +19,15 @@ from dash.dependencies import Input, Output, State
 import plotly
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
 
 # from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
 import geopandas as gpd
+import pyarrow.dataset as ds
+import shapely
+from pyarrow import fs
 
 data_folder = "./"
 
@@ -21,103 +35,301 @@ external_stylesheets = [
     dbc.themes.BOOTSTRAP,
     "https://codepen.io/chriddyp/pen/bWLwgP.css",
 ]
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
+# compress: gzip the callback responses (flask-compress)
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets, compress=True)
 app.title = "Ardashboard"
+# WSGI entry point (gunicorn dashboard:server)
+server = app.server
 
-print("Loading data")
-biodiv = gpd.read_file(data_folder + "biodiv_agg.geojson")
-biodiv["annee_mois"] = biodiv.apply(
-    lambda df: f"{df['year_date']}-{'0' + str(month) if (month := df['year_month']) < 10 else month}",
-    axis=1,
+# Rows per row group of the sorted intersect file (small groups prune better)
+INTERSECT_ROW_GROUP_SIZE = 10_000
+# Decoded intersect selections kept in memory
+INTERSECT_CACHE_SIZE = 32
+# Map trace payloads cache, shared by the gunicorn workers of the machine
+FIGURE_CACHE_DIR = os.environ.get(
+    "FIGURE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ardashboard-cache")
 )
-available_months = sorted(biodiv["annee_mois"].unique())
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get("FIGURE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def month_ordinal(df: pd.DataFrame) -> pd.Series:
+    # Month as an integer ordinal (year * 12 + month - 1)
+    return df["year_date"].astype(int) * 12 + df["year_month"].astype(int) - 1
+
+
+biodiv_file = data_folder + "biodiv_agg.geojson"
+# Arrays derived from biodiv_file, memory-mapped by every worker
+biodiv_cache_folder = data_folder + "biodiv_cache"
 intersect_file = data_folder + "biodiv_intersects.parquet"
+sorted_intersect_file = data_folder + "biodiv_intersects.sorted.parquet"
 
 
-def month_label(month: str):
-    mapping: dict[str, str] = {
-        "01": "janvier",
-        "02": "février",
-        "03": "mars",
-        "04": "avril",
-        "05": "mai",
-        "06": "juin",
-        "07": "juillet",
-        "08": "août",
-        "09": "septembre",
-        "10": "octobre",
-        "11": "novembre",
-        "12": "décembre",
-    }
-    year, m = month.split("-")
-    return f"{mapping[m]} {year}"
+def month_label(month: int):
+    names = [
+        "janvier",
+        "février",
+        "mars",
+        "avril",
+        "mai",
+        "juin",
+        "juillet",
+        "août",
+        "septembre",
+        "octobre",
+        "novembre",
+        "décembre",
+    ]
+    year, m = divmod(int(month), 12)
+    return f"{names[m]} {year}"
+
 
+# Dropdown id -> filtered column
+FACETS = {
+    "species": "nom_valide",
+    "behaviour": "behaviour",
+    "sensibility": "niveau_sensibilite",
+    "species_age": "species_age",
+}
 
-def flatten_with_none(list_of_lists_of_coords: list[list[float]]) -> list[float | None]:
-    result = []
-    for sublist in list_of_lists_of_coords:
-        result.extend(sublist)
-        result.append(None)
-    return result[:-1]  # pop last None
 
+class FilterIndex:
+    """
+    Filter index of the biodiv rows: categorical codes and one packed row
+    bitmap per value of each facet column, and the month ordinals.
+    A selection is the intersection of the month range and of the bitmaps
+    of the selected values.
+    """
 
-def get_coords(geom):
-    if geom.geom_type == "Polygon":
-        return list(geom.exterior.coords.xy)
-    elif geom.geom_type == "MultiPolygon":
-        # For MultiPolygon, return the exterior of the first Polygon (or handle as needed)
-        return list(geom.geoms[0].exterior.coords.xy)
-    else:
-        return [[], []]
+    def __init__(self, months: np.ndarray, values: dict, codes: dict, bitmaps: dict):
+        self.months = months
+        self.values = values
+        self.codes = codes
+        self.bitmaps = bitmaps
+        self.positions = {
+            column: {value: k for k, value in enumerate(column_values)}
+            for column, column_values in values.items()
+        }
 
+    @classmethod
+    def from_gdf(cls, gdf: gpd.GeoDataFrame, columns):
+        values, codes, bitmaps = {}, {}, {}
+        n_bytes = (len(gdf) + 7) // 8
+        for column in columns:
+            categorical = pd.Categorical(gdf[column])
+            # Missing values get code -1 and no bitmap
+            values[column] = categorical.categories.tolist()
+            codes[column] = categorical.codes.astype(np.int32)
+            bitmaps[column] = np.stack(
+                [np.packbits(codes[column] == code) for code in range(len(values[column]))]
+                or [np.zeros(n_bytes, dtype=np.uint8)]
+            )
+        return cls(gdf["month_ordinal"].to_numpy(dtype=np.int32), values, codes, bitmaps)
 
-def build_figure(gdf: gpd.GeoDataFrame, intersect: gpd.GeoDataFrame):
+    def mask(self, month_min: int, month_max: int, selected: dict, exclude=None):
+        # selected: column -> value (None: no filter); exclude skips one facet
+        mask = (self.months >= month_min) & (self.months <= month_max)
+        for column, value in selected.items():
+            if value is None or column == exclude:
+                continue
+            position = self.positions[column].get(value)
+            if position is None:
+                return np.zeros_like(mask)
+            mask &= np.unpackbits(self.bitmaps[column][position], count=len(mask)).astype(bool)
+        return mask
 
-    def _build_scattermap(gdf, **kwargs):
-        if len(gdf) == 0:
-            print(gdf)
-            return
+    def counts(self, column: str, mask: np.ndarray) -> dict:
+        # Rows per value of column within mask
+        codes = self.codes[column][mask]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values[column]))
+        return dict(zip(self.values[column], counts.tolist()))
 
-        gdf_exploded = gdf.explode(index_parts=False)
-        gdf_exploded["lon"], gdf_exploded["lat"] = zip(
-            *gdf_exploded["geometry"].apply(get_coords)
+
+def facet_options(counts: dict):
+    return [
+        {"label": f"{value} ({count})", "value": value}
+        for value, count in counts.items()
+    ]
+
+
+class MapGeometries:
+    """
+    Exterior rings of every row of a GeoDataFrame as flat lon/lat arrays,
+    rings separated by NaN (drawn as gaps by plotly), computed once.
+    Row i covers lon[offsets[i]:offsets[i + 1]], trailing separator included;
+    the label of each point is label_values[label_codes[point]].
+    """
+
+    def __init__(self, lon, lat, offsets, label_codes, label_values):
+        self.lon = lon
+        self.lat = lat
+        self.offsets = offsets
+        self.label_codes = label_codes
+        # Code -1 (missing label) reads the trailing None
+        self.label_values = np.array(list(label_values) + [None], dtype=object)
+
+    @classmethod
+    def from_gdf(cls, gdf: gpd.GeoDataFrame, label_column: str = "nom_valide"):
+        parts, rows = shapely.get_parts(gdf.geometry.values, return_index=True)
+        # Only polygon parts are drawn, like the former get_coords
+        polygons = shapely.get_type_id(parts) == shapely.GeometryType.POLYGON
+        rings = shapely.get_exterior_ring(parts[polygons])
+        rows = rows[polygons]
+        coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+        sizes = shapely.get_num_coordinates(rings) + 1
+
+        # Coordinate j of ring r goes to j + r: one NaN after each ring
+        lonlat = np.full((len(coords) + len(rings), 2), np.nan)
+        lonlat[np.arange(len(coords)) + ring_idx] = coords
+        row_sizes = np.bincount(rows, weights=sizes, minlength=len(gdf)).astype(np.int64)
+        labels = pd.Categorical(gdf[label_column])
+        return cls(
+            np.ascontiguousarray(lonlat[:, 0]),
+            np.ascontiguousarray(lonlat[:, 1]),
+            np.concatenate([[0], np.cumsum(row_sizes)]),
+            np.repeat(labels.codes.astype(np.int32), row_sizes),
+            labels.categories.tolist(),
         )
-        lon = flatten_with_none(
-            [
-                [l for l in gdf_exploded["lon"]][k].tolist()
-                for k in range(len(gdf_exploded))
-            ]
+
+    def select(self, ids: np.ndarray):
+        """
+        lon, lat and labels of the given row positions, concatenated without
+        the last separator.
+        """
+        starts = self.offsets[ids]
+        sizes = self.offsets[ids + 1] - starts
+        total = int(sizes.sum())
+        if total == 0:
+            return None
+        # Position k of the output reads starts[i] + (k - first output index of i)
+        positions = np.repeat(starts - (np.cumsum(sizes) - sizes), sizes) + np.arange(total)
+        positions = positions[:-1]
+        labels = self.label_values[self.label_codes[positions]]
+        return self.lon[positions], self.lat[positions], labels
+
+
+def prepare_intersect(source: str, target: str) -> str:
+    """
+    Copy of the intersect file with a month_ordinal column, sorted by
+    (nom_valide, month_ordinal) in small row groups with statistics, so that
+    filter pushdown skips row groups. Rebuilt when the source is newer.
+    """
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return target
+    print("Sorting intersect file")
+    intersect = gpd.read_parquet(source)
+    intersect["month_ordinal"] = month_ordinal(intersect)
+    intersect = intersect.sort_values(["nom_valide", "month_ordinal"], kind="stable")
+    intersect.to_parquet(
+        target + ".tmp",
+        index=False,
+        row_group_size=INTERSECT_ROW_GROUP_SIZE,
+        write_statistics=True,
+    )
+    os.replace(target + ".tmp", target)
+    return target
+
+
+@lru_cache(maxsize=INTERSECT_CACHE_SIZE)
+def intersect_geometries(month_min: int, month_max: int, filters: tuple) -> MapGeometries:
+    """
+    Intersections within the month window matching the (column, value)
+    filters, read from the memory-mapped file with both predicates pushed
+    down, and decoded once per distinct selection.
+    """
+    expression = (ds.field("month_ordinal") >= month_min) & (
+        ds.field("month_ordinal") <= month_max
+    )
+    for column, value in filters:
+        expression &= ds.field(column) == value
+    table = intersect_dataset.to_table(
+        columns=[intersect_geometry_column, "nom_valide"], filter=expression
+    )
+    geometry = shapely.from_wkb(
+        table.column(intersect_geometry_column).to_numpy(zero_copy_only=False)
+    )
+    return MapGeometries.from_gdf(
+        gpd.GeoDataFrame(
+            {"nom_valide": table.column("nom_valide").to_pandas()}, geometry=geometry
         )
-        labels = []
-        idx = 0
-        for k in range(len(lon)):
-            if lon[k] is None:
-                idx += 1
-            labels.append(gdf_exploded["nom_valide"].iloc[gdf_exploded.index[idx]])
-        return go.Scattermap(
-            mode="lines",
-            lon=lon,
-            lat=flatten_with_none(
-                [
-                    [l for l in gdf_exploded["lat"]][k].tolist()
-                    for k in range(len(gdf_exploded))
-                ]
-            ),
-            text=labels,
-            **kwargs,
+    )
+
+
+class FigureCache:
+    """
+    Map trace payloads per normalized selection, compressed in a SQLite file
+    shared by the gunicorn workers; least recently used entries are evicted
+    beyond max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS payload ("
+            " key TEXT PRIMARY KEY, data BLOB, size INTEGER, accessed REAL)"
         )
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_payload_accessed ON payload (accessed)")
 
-    print("Creating figure")
-    fig = go.Figure(_build_scattermap(gdf, **{"fill": "toself"}))
-    print("Adding trace")
-    # only a subset here because it's so slow
-    if len(intersect) > 0:
-        fig.add_trace(
-            _build_scattermap(
-                intersect[: min(3000, len(intersect))],
-                **{"marker": {"size": 5, "color": "red"}},
-            )
+    def _connection(self):
+        # One connection per thread and process (not inherited from the
+        # gunicorn master), WAL journal for concurrent workers
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def get(self, key: str):
+        connection = self._connection()
+        row = connection.execute("SELECT data FROM payload WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE payload SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, payload):
+        data = zlib.compress(to_json_plotly(payload).encode())
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO payload (key, data, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, data, len(data), time.time()),
         )
+        total = connection.execute("SELECT coalesce(sum(size), 0) FROM payload").fetchone()[0]
+        while total > self.max_bytes:
+            rows = connection.execute(
+                "SELECT key, size FROM payload ORDER BY accessed LIMIT 16"
+            ).fetchall()
+            if not rows:
+                break
+            connection.executemany("DELETE FROM payload WHERE key = ?", [(k,) for k, _ in rows])
+            total -= sum(size for _, size in rows)
+
+
+def trace_data(geometries: MapGeometries, ids: np.ndarray) -> dict:
+    # lon / lat / text of a map trace for the selected rows
+    selection = geometries.select(ids)
+    if selection is None:
+        return {"lon": [], "lat": [], "text": []}
+    lon, lat, labels = selection
+    return {"lon": lon, "lat": lat, "text": labels}
+
+
+def build_figure():
+    """
+    Base map with its two traces (observations, intersections) left empty:
+    the callback only patches their data, the layout is sent once.
+    """
+    fig = go.Figure(
+        [
+            go.Scattermap(mode="lines", fill="toself"),
+            go.Scattermap(mode="lines", marker={"size": 5, "color": "red"}),
+        ]
+    )
     fig.update_layout(
         map={
             "style": "open-street-map",
@@ -130,6 +342,133 @@ def build_figure(gdf: gpd.GeoDataFrame, intersect: gpd.GeoDataFrame):
     return fig
 
 
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _replace(path: str, write):
+    # Written under a temporary name then renamed: running workers keep their mapping
+    with open(path + ".tmp", "wb") as f:
+        write(f)
+    os.replace(path + ".tmp", path)
+
+
+def _write_meta(folder: str, meta: dict):
+    _replace(os.path.join(folder, "meta.json"), lambda f: f.write(json.dumps(meta).encode()))
+
+
+def build_biodiv_cache(source: str, folder: str, sha256: str) -> dict:
+    """
+    Parses the GeoJSON once and saves the arrays used by the callbacks
+    (.npy files) and, last, meta.json with the facet values, their counts
+    and the available months, used to build the layout.
+    """
+    print("Converting", source)
+    biodiv = gpd.read_file(source)
+    biodiv["month_ordinal"] = month_ordinal(biodiv)
+    geometries = MapGeometries.from_gdf(biodiv)
+    index = FilterIndex.from_gdf(biodiv, FACETS.values())
+
+    arrays = {
+        "lon": geometries.lon,
+        "lat": geometries.lat,
+        "offsets": geometries.offsets,
+        "label_codes": geometries.label_codes,
+        "months": index.months,
+    }
+    for column in FACETS.values():
+        arrays[f"codes_{column}"] = index.codes[column]
+        arrays[f"bitmaps_{column}"] = index.bitmaps[column]
+    os.makedirs(folder, exist_ok=True)
+    for name, array in arrays.items():
+        _replace(os.path.join(folder, name + ".npy"), lambda f: np.save(f, array))
+
+    all_rows = np.ones(len(biodiv), dtype=bool)
+    meta = {
+        "source_mtime": os.path.getmtime(source),
+        "source_sha256": sha256,
+        "months": np.unique(index.months).tolist(),
+        "label_values": geometries.label_values[:-1].tolist(),
+        "values": index.values,
+        "counts": {
+            column: list(index.counts(column, all_rows).values()) for column in FACETS.values()
+        },
+    }
+    _write_meta(folder, meta)
+    return meta
+
+
+def load_biodiv_cache(source: str, folder: str):
+    """
+    Map geometries, filter index and metadata of source from the cache
+    folder, rebuilt when the source changed (new mtime and new content hash).
+    Arrays are memory-mapped: nothing is parsed at startup and the pages are
+    shared by the preforked workers.
+    """
+    meta = None
+    meta_path = os.path.join(folder, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    mtime = os.path.getmtime(source)
+    if meta is None or meta["source_mtime"] != mtime:
+        sha256 = file_sha256(source)
+        if meta is None or meta["source_sha256"] != sha256:
+            meta = build_biodiv_cache(source, folder, sha256)
+        else:
+            # Same content (copied or touched file): only the mtime changes
+            meta["source_mtime"] = mtime
+            _write_meta(folder, meta)
+
+    def load(name):
+        return np.load(os.path.join(folder, name + ".npy"), mmap_mode="r")
+
+    geometries = MapGeometries(
+        load("lon"), load("lat"), load("offsets"), load("label_codes"), meta["label_values"]
+    )
+    index = FilterIndex(
+        load("months"),
+        meta["values"],
+        {column: load(f"codes_{column}") for column in FACETS.values()},
+        {column: load(f"bitmaps_{column}") for column in FACETS.values()},
+    )
+    return geometries, index, meta
+
+
+print("Loading data")
+biodiv_geometries, filter_index, biodiv_meta = load_biodiv_cache(
+    biodiv_file, biodiv_cache_folder
+)
+# Slider positions index the available month ordinals
+available_months = np.array(biodiv_meta["months"])
+
+
+def initial_options(column: str):
+    # Options with the counts over all rows, read from the cache metadata
+    return facet_options(
+        dict(zip(biodiv_meta["values"][column], biodiv_meta["counts"][column]))
+    )
+
+
+intersect_dataset = ds.dataset(
+    prepare_intersect(intersect_file, sorted_intersect_file),
+    format="parquet",
+    filesystem=fs.LocalFileSystem(use_mmap=True),
+)
+figure_cache = FigureCache(
+    os.path.join(FIGURE_CACHE_DIR, "figures.sqlite"), FIGURE_CACHE_MAX_BYTES
+)
+intersect_geometry_column = json.loads(intersect_dataset.schema.metadata[b"geo"])[
+    "primary_column"
+]
+# Part of the figure cache keys: entries of previous data are never read
+data_version = f"{biodiv_meta['source_sha256']}-{os.path.getmtime(intersect_file)}"
+
+
 # %% APP LAYOUT:
 app.layout = dbc.Container(
     [
@@ -165,13 +504,7 @@ app.layout = dbc.Container(
                 html.H6("Espèce d'intérêt"),
                 dcc.Dropdown(
                     id="species",
-                    options=[
-                        {
-                            "label": espece,
-                            "value": espece,
-                        }
-                        for espece in biodiv["nom_valide"].unique()
-                    ],
+                    options=initial_options("nom_valide"),
                 ),
             ]
         ),
@@ -180,13 +513,7 @@ app.layout = dbc.Container(
                 html.H6("Comportement"),
                 dcc.Dropdown(
                     id="behaviour",
-                    options=[
-                        {
-                            "label": behaviour,
-                            "value": behaviour,
-                        }
-                        for behaviour in biodiv["behaviour"].unique()
-                    ],
+                    options=initial_options("behaviour"),
                 ),
             ]
         ),
@@ -195,13 +522,7 @@ app.layout = dbc.Container(
                 html.H6("Niveau de sensibilité"),
                 dcc.Dropdown(
                     id="sensibility",
-                    options=[
-                        {
-                            "label": sensibility,
-                            "value": sensibility,
-                        }
-                        for sensibility in biodiv["niveau_sensibilite"].unique()
-                    ],
+                    options=initial_options("niveau_sensibilite"),
                 ),
             ]
         ),
@@ -210,19 +531,13 @@ app.layout = dbc.Container(
                 html.H6("Âge des individus"),
                 dcc.Dropdown(
                     id="species_age",
-                    options=[
-                        {
-                            "label": species_age,
-                            "value": species_age,
-                        }
-                        for species_age in biodiv["species_age"].unique()
-                    ],
+                    options=initial_options("species_age"),
                 ),
             ]
         ),
         dbc.Row(
             [
-                dcc.Graph(id="map"),
+                dcc.Graph(id="map", figure=build_figure()),
             ],
             style={"padding": "15px 0px 5px 0px"},
         ),
@@ -248,30 +563,57 @@ def update_map(
     sensibility: str,
     species_age: str,
 ):
-    filters = []
     mmin, mmax = months_idx
-    restr = biodiv.loc[
-        (biodiv["annee_mois"].between(available_months[mmin], available_months[mmax]))
-    ]
-    if species is not None:
-        print(species)
-        restr = restr[restr["nom_valide"] == species]
-
-        filters.append(("nom_valide", "=", species))
-    if behaviour is not None:
-        restr = restr[restr["behaviour"] == behaviour]
-        filters.append(("behaviour", "=", behaviour))
-    if sensibility is not None:
-        restr = restr[restr["niveau_sensibilite"] == sensibility]
-        filters.append(("niveau_sensibilite", "=", sensibility))
-    if species_age is not None:
-        restr = restr[restr["species_age"] == species_age]
-        filters.append(("species_age", "=", species_age))
-    intersect = gpd.read_parquet(
-        intersect_file,
-        filters=filters or None,
+    month_min, month_max = int(available_months[mmin]), int(available_months[mmax])
+    selected = {
+        "nom_valide": species,
+        "behaviour": behaviour,
+        "niveau_sensibilite": sensibility,
+        "species_age": species_age,
+    }
+    filters = tuple(
+        (column, value) for column, value in selected.items() if value is not None
     )
-    return build_figure(restr.reset_index(drop=True), intersect)
+    key = json.dumps([data_version, month_min, month_max, filters])
+    payload = figure_cache.get(key)
+    if payload is None:
+        intersect = intersect_geometries(month_min, month_max, filters)
+        payload = [
+            trace_data(
+                biodiv_geometries,
+                np.flatnonzero(filter_index.mask(month_min, month_max, selected)),
+            ),
+            trace_data(intersect, np.arange(len(intersect.offsets) - 1)),
+        ]
+        figure_cache.set(key, payload)
+
+    # Only the trace data is sent, the base map layout stays in the browser
+    figure = Patch()
+    for k, data in enumerate(payload):
+        for name, values in data.items():
+            figure["data"][k][name] = values
+    return figure
+
+
+@dash.callback(
+    [Output(dropdown, "options") for dropdown in FACETS],
+    [Input("months_slider", "value")] + [Input(dropdown, "value") for dropdown in FACETS],
+)
+def update_options(months_idx: tuple[int, int], *values):
+    # Live counts of each facet value given the months and the other facets
+    mmin, mmax = months_idx
+    selected = dict(zip(FACETS.values(), values))
+    return [
+        facet_options(
+            filter_index.counts(
+                column,
+                filter_index.mask(
+                    available_months[mmin], available_months[mmax], selected, exclude=column
+                ),
+            )
+        )
+        for column in FACETS.values()
+    ]
 
 
 if __name__ == "__main__":